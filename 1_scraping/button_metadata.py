@@ -0,0 +1,105 @@
+import re
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin
+
+
+# Function to extract fields
+def extract_metadata(text):
+    title_match = re.search(r'TITLE\s*(.*)', text)
+    date_match = re.search(r'DATE\s*(\d{4})', text)  # Look for a 4-digit year
+    extent_match = re.search(r'EXTENT\s*(diameter:\s*[\d\.]+ cm)', text)
+    subjects_match = re.search(r'SUBJECTS\s*(.*)', text)
+
+    # Extract values or assign 'na' if not found
+    title = title_match.group(1).strip().replace(" ", "-") if title_match else "na"
+    date = date_match.group(1).strip() if date_match else "na"
+    extent = extent_match.group(1).strip().replace("diameter: ", "").replace(" ", "") if extent_match else "na"
+    subjects = subjects_match.group(1).strip().split("\n")[0].replace(" ", "-") if subjects_match else "na"
+
+    # Construct formatted filename
+    filename = f"{title}_{date}_{subjects}_{extent}"
+    return filename
+
+
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6", "section", "header", "footer"}
+LABEL_TAGS = {"dt", "th"}
+
+
+class _PageParser(HTMLParser):
+    """Collects the visible text and the links of a page without a browser."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = [""]
+        self.links = []  # (href, link text)
+        self._skip = 0
+        self._label = 0
+        self._href = None
+        self._link_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "noscript"):
+            self._skip += 1
+        elif tag in BLOCK_TAGS:
+            self.lines.append("")
+        if tag in LABEL_TAGS:
+            self._label += 1
+        if tag == "a":
+            self._href = dict(attrs).get("href")
+            self._link_text = []
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "noscript"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in BLOCK_TAGS:
+            self.lines.append("")
+        if tag in LABEL_TAGS:
+            self._label = max(0, self._label - 1)
+        if tag == "a" and self._href is not None:
+            self.links.append((self._href, " ".join("".join(self._link_text).split())))
+            self._href = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._href is not None:
+            self._link_text.append(data)
+        if self._label:
+            # The site upper-cases field labels with CSS, which innerText reflects ("TITLE")
+            data = data.upper().rstrip(": ")
+        self.lines[-1] += data
+
+    def text(self):
+        lines = (" ".join(line.split()) for line in self.lines)
+        return "\n".join(line for line in lines if line)
+
+
+def parse_page(html):
+    """Return (text, links) for an HTML page; text approximates document.body.innerText."""
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.text(), parser.links
+
+
+def find_button_links(links, page_url, collection="political-buttons"):
+    """Absolute URLs of the item pages linked from a catalog search page (deduplicated, in page order)."""
+    item = re.compile(rf"/{re.escape(collection)}/catalog/[^/?#]+$")
+    urls = []
+    for href, _ in links:
+        if not href:
+            continue
+        # "#details" anchors point at the same item; links with a query are facets (range_limit?...)
+        url = urldefrag(urljoin(page_url, href)).url
+        if "?" not in url and item.search(url):
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+
+def find_image_url(links, page_url, label="Medium: 800 x 800 px"):
+    """URL of the download link whose text contains `label`, or None."""
+    for href, text in links:
+        if href and label in text:
+            return urljoin(page_url, href)
+    return None
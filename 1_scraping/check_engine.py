@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from scraper_engine import ScraperEngine
+
+# Pages the stub server serves (stub_site/): one catalog page listing six buttons.
+#   item-1 / item-2: same metadata (same filename), different images
+#   item-3 / item-4: different metadata, byte-identical images
+#   item-5: download link only added by JavaScript (fails without a browser)
+#   item-6: plain button, with a smaller rendition linked first
+STUB_SITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_site")
+IMAGES = {
+    "kennedy-a.jpg": b"kennedy A " * 4000,
+    "kennedy-b.jpg": b"kennedy B " * 4000,
+    "ike.jpg": b"ike " * 9000,
+    "ike-copy.jpg": b"ike " * 9000,
+    "peace.jpg": b"peace " * 7000,
+}
+# Images are sent in this many slow chunks so concurrent downloads overlap
+IMAGE_CHUNKS = 8
+
+
+class StubHandler(SimpleHTTPRequestHandler):
+    """Serves stub_site/ at the catalog's URLs and IMAGES under /images/, with ETag revalidation."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=STUB_SITE, **kwargs)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("/catalog"):
+            page = parse_qs(url.query).get("page", ["1"])[0]
+            self.path = "/catalog.html" if page == "1" else "/empty.html"
+        elif url.path.startswith("/political-buttons/catalog/"):
+            self.path = f"/{url.path.rsplit('/', 1)[1]}.html"
+        elif url.path.startswith("/images/"):
+            return self.send_image(url.path[len("/images/"):])
+        return super().do_GET()
+
+    def send_image(self, name):
+        data = IMAGES.get(name)
+        if data is None:
+            return self.send_error(404)
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        step = len(data) // IMAGE_CHUNKS + 1
+        for i in range(0, len(data), step):
+            self.wfile.write(data[i:i + step])
+            self.wfile.flush()
+            time.sleep(0.02)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_engine(base_url, save_path, refresh=False):
+    engine = ScraperEngine(save_path, base_url=base_url, concurrency=4, rate=0, browser_workers=0, refresh=refresh)
+    return asyncio.run(engine.run(range(1, 3)))
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scraper engine end to end against a local stub of the catalog.")
+    parser.add_argument("--keep", action="store_true", help="Keep the download folder and print its path")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    save_path = tempfile.mkdtemp(prefix="scraper_check_")
+    ok = True
+    try:
+        stats = run_engine(base_url, save_path)
+        ok &= check(stats["saved"] == 4 and stats["duplicates"] == 1 and stats["failed"] == 1,
+                    f"first run: 4 saved, 1 duplicate, 1 failed (got {stats['saved']}, {stats['duplicates']}, {stats['failed']})")
+
+        files = sorted(name for name in os.listdir(save_path) if not name.startswith("."))
+        ok &= check(not any(name.endswith(".part") for name in files), "no temp files left behind")
+        ok &= check(len(files) == 4, f"4 images on disk: {files}")
+
+        # Every downloaded URL must point at a file holding exactly its bytes
+        conn = sqlite3.connect(os.path.join(save_path, ".crawl_manifest.db"))
+        rows = conn.execute("SELECT url, local_path FROM downloads WHERE url LIKE '%/images/%'").fetchall()
+        conn.close()
+        for url, local_path in rows:
+            with open(local_path, "rb") as f:
+                ok &= check(f.read() == IMAGES[url.rsplit("/", 1)[1]], f"{url.rsplit('/', 1)[1]} -> {os.path.basename(local_path)}")
+        kennedy = {os.path.basename(path) for url, path in rows if "kennedy" in url}
+        ok &= check(len(kennedy) == 2, "buttons with the same metadata were saved under two names")
+
+        stats = run_engine(base_url, save_path)
+        ok &= check(stats["skipped"] == 5 and stats["saved"] == 0, f"second run skips finished items (skipped {stats['skipped']})")
+
+        stats = run_engine(base_url, save_path, refresh=True)
+        ok &= check(stats["unchanged"] == 5 and stats["saved"] == 0,
+                    f"--refresh revalidates with ETags (unchanged {stats['unchanged']})")
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"📄 Downloads kept in {save_path}")
+        else:
+            shutil.rmtree(save_path, ignore_errors=True)
+
+    print("✅ Scraper engine check passed" if ok else "❌ Scraper engine check failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
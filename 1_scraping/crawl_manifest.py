@@ -0,0 +1,175 @@
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class CrawlManifest:
+    """
+    Persistent record of what the scrapers already fetched:
+    url -> status, ETag / Last-Modified, content hash and where the file was saved.
+    Lets a re-run skip finished items, revalidate with conditional requests and
+    avoid writing the same image twice when it appears under several catalog URLs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,          -- 'done', 'duplicate' or 'failed'
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                local_path TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_downloads_hash ON downloads (content_hash)")
+        self.conn.commit()
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT status, etag, last_modified, content_hash, local_path FROM downloads WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("status", "etag", "last_modified", "content_hash", "local_path"), row))
+
+    def is_done(self, url):
+        entry = self.get(url)
+        return entry is not None and entry["status"] in ("done", "duplicate")
+
+    def record(self, url, status, etag=None, last_modified=None, content_hash=None, local_path=None):
+        self.conn.execute(
+            "INSERT INTO downloads (url, status, etag, last_modified, content_hash, local_path, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (url) DO UPDATE SET status = excluded.status, etag = excluded.etag, "
+            "last_modified = excluded.last_modified, content_hash = excluded.content_hash, "
+            "local_path = excluded.local_path, updated_at = excluded.updated_at",
+            (url, status, etag, last_modified, content_hash, local_path, time.time()),
+        )
+        self.conn.commit()
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since for a URL we already have."""
+        entry = self.get(url)
+        headers = {}
+        if entry and entry["local_path"] and os.path.exists(entry["local_path"]):
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def existing_copy(self, content_hash, url=None):
+        """Path of a file with these bytes already saved for another URL, if it's still on disk."""
+        rows = self.conn.execute(
+            "SELECT local_path FROM downloads WHERE content_hash = ? AND status = 'done' AND url IS NOT ?", (content_hash, url)
+        ).fetchall()
+        for (path,) in rows:
+            if path and os.path.exists(path):
+                return path
+        return None
+
+    def owner(self, path):
+        """URL whose download was saved at this path, if any."""
+        row = self.conn.execute(
+            "SELECT url FROM downloads WHERE local_path = ? AND status = 'done' AND content_hash IS NOT NULL", (path,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def free_path(self, url, final_path):
+        """
+        final_path, or final_path with a _2, _3, ... suffix when another URL's file (or a file
+        the manifest doesn't know about) is already there: two different buttons with the
+        same metadata must not overwrite each other.
+        """
+        root, ext = os.path.splitext(final_path)
+        path, n = final_path, 2
+        while os.path.exists(path) and self.owner(path) != url:
+            path, n = f"{root}_{n}{ext}", n + 1
+        return path
+
+    def finish(self, url, tmp_path, final_path, content_hash, etag=None, last_modified=None):
+        """
+        Move a fully downloaded temp file into place, unless the same bytes are already
+        saved under another name. Returns 'done' or 'duplicate'; manifest.get(url) has the
+        path actually used.
+        """
+        duplicate_of = self.existing_copy(content_hash, url)
+        if duplicate_of:
+            os.remove(tmp_path)
+            self.record(url, "duplicate", etag, last_modified, content_hash, duplicate_of)
+            return "duplicate"
+        path = self.free_path(url, final_path)
+        if path != final_path:
+            print(f"⚠️ {os.path.basename(final_path)} belongs to another URL, saving as {os.path.basename(path)}")
+            final_path = path
+        os.replace(tmp_path, final_path)
+        self.record(url, "done", etag, last_modified, content_hash, final_path)
+        return "done"
+
+    def close(self):
+        self.conn.close()
+
+
+def _temp_file(final_path):
+    """A temp file of our own next to final_path, so concurrent downloads never share one."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final_path) or ".", suffix=".part")
+    return os.fdopen(fd, "wb"), tmp_path
+
+
+def download(session, url, final_path, manifest, refresh=False, timeout=10):
+    """
+    Stream one file to disk with a requests.Session, recording it in the manifest.
+    Returns 'skipped', 'not-modified', 'done', 'duplicate' or raises on HTTP errors.
+    """
+    if manifest.is_done(url) and not refresh:
+        return "skipped"
+    headers = manifest.conditional_headers(url) if refresh else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return "not-modified"
+        response.raise_for_status()
+        sha = hashlib.sha256()
+        file, tmp_path = _temp_file(final_path)
+        try:
+            with file:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    sha.update(chunk)
+                    file.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return manifest.finish(url, tmp_path, final_path, sha.hexdigest(),
+                               response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+async def download_async(client, url, final_path, manifest, refresh=False):
+    """Same as download(), for an httpx.AsyncClient."""
+    if manifest.is_done(url) and not refresh:
+        return "skipped"
+    headers = manifest.conditional_headers(url) if refresh else {}
+
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return "not-modified"
+        response.raise_for_status()
+        sha = hashlib.sha256()
+        file, tmp_path = _temp_file(final_path)
+        try:
+            with file:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    sha.update(chunk)
+                    file.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return manifest.finish(url, tmp_path, final_path, sha.hexdigest(),
+                               response.headers.get("ETag"), response.headers.get("Last-Modified"))
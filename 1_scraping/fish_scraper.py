@@ -9,6 +9,7 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from crawl_manifest import CrawlManifest, download
 
 
 
@@ -16,6 +17,10 @@ from selenium.webdriver.support import expected_conditions as EC
 save_path = os.path.expanduser("~/Desktop/Harvard_Jacques_Burkhardt_Scientific_Drawings")
 os.makedirs(save_path, exist_ok=True)
 
+# Remembers finished pages and downloaded files, so a re-run only fetches what's new
+manifest = CrawlManifest(os.path.join(save_path, ".crawl_manifest.db"))
+session = requests.Session()
+
 # Setup Chrome options
 options = Options()
 options.add_argument("--headless")  # Run in background
@@ -31,6 +36,9 @@ base_url = "https://curiosity.lib.harvard.edu/jacques-burkhardt-scientific-drawi
 # Loop through pages (001 to 010 as an example)
 for i in range(1, 11):
     url = f"{base_url}{i:03d}"  # Formats the number to three digits (e.g., 001, 002, ..., 010)
+    if manifest.is_done(url):
+        print(f"⏭️ Already downloaded: {url}")
+        continue
     print(f"\n🔎 Accessing URL: {url}")
     driver.get(url)
 
@@ -54,14 +62,10 @@ for i in range(1, 11):
                 img_url = link.get_attribute("href")
                 print(f"Downloading image {idx}: {img_url}")
 
-                response = requests.get(img_url)
-                if response.status_code == 200:
-                    file_path = os.path.join(save_path, f"harvard_image_{i:03d}_{idx}.jpg")
-                    with open(file_path, "wb") as file:
-                        file.write(response.content)
-                    print(f"✅ Saved: {file_path}")
-                else:
-                    print(f"❌ Failed to download image {idx} (Status Code: {response.status_code})")
+                file_path = os.path.join(save_path, f"harvard_image_{i:03d}_{idx}.jpg")
+                status = download(session, img_url, file_path, manifest)
+                print(f"✅ {status.capitalize()}: {file_path}")
+            manifest.record(url, "done")
 
         else:
             print("⚠️ No downloadable images found!")
@@ -71,4 +75,5 @@ for i in range(1, 11):
 
 # Close the browser
 driver.quit()
+manifest.close()
 print("Test complete.")
@@ -1,7 +1,6 @@
 import os
 import time
 import requests
-import re
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
@@ -9,28 +8,17 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-
-# Function to extract fields
-def extract_metadata(text):
-    title_match = re.search(r'TITLE\s*(.*)', text)
-    date_match = re.search(r'DATE\s*(\d{4})', text)  # Look for a 4-digit year
-    extent_match = re.search(r'EXTENT\s*(diameter:\s*[\d\.]+ cm)', text)
-    subjects_match = re.search(r'SUBJECTS\s*(.*)', text)
-
-    # Extract values or assign 'na' if not found
-    title = title_match.group(1).strip().replace(" ", "-") if title_match else "na"
-    date = date_match.group(1).strip() if date_match else "na"
-    extent = extent_match.group(1).strip().replace("diameter: ", "").replace(" ", "") if extent_match else "na"
-    subjects = subjects_match.group(1).strip().split("\n")[0].replace(" ", "-") if subjects_match else "na"
-
-    # Construct formatted filename
-    filename = f"{title}_{date}_{subjects}_{extent}"
-    return filename
+from button_metadata import extract_metadata
+from crawl_manifest import CrawlManifest, download
 
 # Define the folder to save images
 save_path = os.path.expanduser("~/Desktop/Harvard_Political_Buttons_round_2")
 os.makedirs(save_path, exist_ok=True)
 
+# Remembers finished pages and downloaded files, so a re-run only fetches what's new
+manifest = CrawlManifest(os.path.join(save_path, ".crawl_manifest.db"))
+session = requests.Session()
+
 # Setup Chrome options
 options = Options()
 options.add_argument("--headless")  # Run in background
@@ -44,8 +32,8 @@ driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), opti
 base_url = "https://curiosity.lib.harvard.edu"
 search_url_template = "https://curiosity.lib.harvard.edu/political-buttons/catalog?page={}&per_page=96&search_field=all_fields"
 
-# Loop through all 30 pages
-for page_num in range(16, 31):  # Adjust the range if necessary
+# Loop through all 30 pages (already-downloaded buttons are skipped)
+for page_num in range(1, 31):
     search_results_url = search_url_template.format(page_num)
     print(f"\n📄 Scraping page {page_num}: {search_results_url}")
     
@@ -67,6 +55,9 @@ for page_num in range(16, 31):  # Adjust the range if necessary
 
     # Step 3: Visit each button page and download the correct 800x800 image
     for idx, button_url in enumerate(unique_links, start=1):
+        if manifest.is_done(button_url):
+            print(f"⏭️ Already downloaded button page {idx}")
+            continue
         print(f"\n🔎 Accessing button page {idx}: {button_url}")
 
         try:
@@ -92,15 +83,15 @@ for page_num in range(16, 31):  # Adjust the range if necessary
 
             print(f"📸 Downloading: {img_url}")
 
-            # Download and save the image
-            response = requests.get(img_url, timeout=10)
-            if response.status_code == 200:
-                file_path = os.path.join(save_path, f"{formatted_filename}.jpg")
-                with open(file_path, "wb") as file:
-                    file.write(response.content)
-                print(f"✅ Saved: {file_path}")
+            # Stream the image to disk (skipped if this URL or the same bytes were already saved)
+            file_path = os.path.join(save_path, f"{formatted_filename}.jpg")
+            status = download(session, img_url, file_path, manifest)
+            entry = manifest.get(img_url)
+            manifest.record(button_url, "done", local_path=entry["local_path"] if entry else file_path)
+            if status == "duplicate":
+                print(f"♻️ Same image already saved as {entry['local_path']}")
             else:
-                print(f"❌ Failed to download image {idx} (Status Code: {response.status_code})")
+                print(f"✅ Saved: {entry['local_path'] if entry else file_path}")
 
         except Exception as e:
             print(f"❌ Error on page {idx}: {e}")
@@ -108,4 +99,5 @@ for page_num in range(16, 31):  # Adjust the range if necessary
 
 # Close the browser
 driver.quit()
+manifest.close()
 print("✅ All images downloaded!")
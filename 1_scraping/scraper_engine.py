@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import argparse
+import httpx
+from button_metadata import extract_metadata, find_button_links, find_image_url, parse_page
+from crawl_manifest import CrawlManifest, download_async
+
+BASE_URL = "https://curiosity.lib.harvard.edu"
+SEARCH_PATH = "/{collection}/catalog?page={page}&per_page={per_page}&search_field=all_fields"
+IMAGE_LABEL = "Medium: 800 x 800 px"
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart, across every stage of the pipeline."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BrowserPool:
+    """
+    A few headless Chrome instances for pages whose download link only appears after
+    JavaScript runs. Drivers start on first use, so plain-HTML crawls never launch Chrome.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._drivers = asyncio.Queue()
+        self._started = 0
+
+    def _start_driver(self):
+        # Imported here so the engine runs without Selenium installed when no fallback is needed
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        options = Options()
+        options.add_argument("--headless")  # Run in background
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-blink-features=AutomationControlled")  # Prevent bot detection
+        return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+    @staticmethod
+    def _render(driver, url):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        driver.get(url)
+        link = WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, f"//a[contains(text(), '{IMAGE_LABEL}')]"))
+        )
+        return driver.execute_script("return document.body.innerText;"), link.get_attribute("href")
+
+    async def render(self, url):
+        """Return (page text, image url) as seen by a real browser."""
+        if self._drivers.empty() and self._started < self.size:
+            self._started += 1
+            driver = await asyncio.to_thread(self._start_driver)
+        else:
+            driver = await self._drivers.get()
+        try:
+            return await asyncio.to_thread(self._render, driver, url)
+        finally:
+            self._drivers.put_nowait(driver)
+
+    def close(self):
+        while not self._drivers.empty():
+            self._drivers.get_nowait().quit()
+
+
+class ScraperEngine:
+    """
+    Three pipelined stages connected by queues:
+      catalog pages -> item pages (metadata + image link) -> image downloads.
+    All HTTP goes through one pooled httpx client; a RateLimiter replaces fixed sleeps.
+    A CrawlManifest in save_path lets re-runs skip finished items; with refresh=True
+    they're revisited with conditional requests instead.
+    """
+
+    def __init__(self, save_path, base_url=BASE_URL, collection="political-buttons", per_page=96,
+                 concurrency=8, rate=4.0, browser_workers=1, timeout=20.0, refresh=False):
+        self.save_path = save_path
+        self.refresh = refresh
+        self.manifest = None
+        self.base_url = base_url.rstrip("/")
+        self.collection = collection
+        self.per_page = per_page
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.browsers = BrowserPool(browser_workers) if browser_workers > 0 else None
+        self.timeout = timeout
+        self.stats = {"pages": 0, "items": 0, "saved": 0, "skipped": 0, "unchanged": 0,
+                      "duplicates": 0, "failed": 0, "browser": 0}
+
+    async def fetch(self, client, url):
+        await self.limiter.wait()
+        response = await client.get(url)
+        response.raise_for_status()
+        return response
+
+    async def catalog_stage(self, client, pages, items):
+        for page_num in pages:
+            url = self.base_url + SEARCH_PATH.format(collection=self.collection, page=page_num, per_page=self.per_page)
+            print(f"\n📄 Scraping page {page_num}: {url}")
+            try:
+                _, links = parse_page((await self.fetch(client, url)).text)
+            except httpx.HTTPError as e:
+                print(f"❌ Error on page {page_num}: {e}")
+                continue
+            button_urls = find_button_links(links, url, self.collection)
+            self.stats["pages"] += 1
+            print(f"🔎 Found {len(button_urls)} unique button pages on page {page_num}!")
+            for button_url in button_urls:
+                await items.put(button_url)
+
+    async def item_stage(self, client, items, downloads):
+        while True:
+            button_url = await items.get()
+            if button_url is None:
+                break
+            if not self.refresh and self.manifest.is_done(button_url):
+                self.stats["skipped"] += 1
+                continue
+            try:
+                response = await self.fetch(client, button_url)
+                text, links = parse_page(response.text)
+                img_url = find_image_url(links, button_url, IMAGE_LABEL)
+                if img_url is None and self.browsers is not None:
+                    # The static HTML didn't have the link; let a real browser render the page
+                    self.stats["browser"] += 1
+                    text, img_url = await self.browsers.render(button_url)
+                if img_url is None:
+                    raise ValueError("no image link on page")
+                self.stats["items"] += 1
+                await downloads.put((button_url, extract_metadata(text), img_url))
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"❌ Error on {button_url}: {e}")
+
+    async def download_stage(self, client, downloads):
+        while True:
+            job = await downloads.get()
+            if job is None:
+                break
+            button_url, formatted_filename, img_url = job
+            file_path = os.path.join(self.save_path, f"{formatted_filename}.jpg")
+            try:
+                await self.limiter.wait()
+                # Streams to a temp file in chunks; identical bytes already on disk aren't written twice
+                status = await download_async(client, img_url, file_path, self.manifest, refresh=self.refresh)
+                entry = self.manifest.get(img_url)
+                self.manifest.record(button_url, "done", local_path=entry["local_path"] if entry else file_path)
+                if status == "done":
+                    self.stats["saved"] += 1
+                    print(f"✅ Saved: {entry['local_path']}")
+                elif status == "duplicate":
+                    self.stats["duplicates"] += 1
+                    print(f"♻️ Same image already saved as {entry['local_path']}")
+                else:
+                    self.stats["unchanged"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"❌ Failed to download {img_url}: {e}")
+
+    async def run(self, pages):
+        os.makedirs(self.save_path, exist_ok=True)
+        self.manifest = CrawlManifest(os.path.join(self.save_path, ".crawl_manifest.db"))
+        # Bounded queues give back-pressure: a slow stage holds up the one feeding it
+        items = asyncio.Queue(maxsize=self.concurrency * 4)
+        downloads = asyncio.Queue(maxsize=self.concurrency * 4)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        start = time.perf_counter()
+
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True) as client:
+            item_workers = [asyncio.create_task(self.item_stage(client, items, downloads)) for _ in range(self.concurrency)]
+            download_workers = [asyncio.create_task(self.download_stage(client, downloads)) for _ in range(self.concurrency)]
+
+            await self.catalog_stage(client, pages, items)
+            for _ in item_workers:
+                await items.put(None)
+            await asyncio.gather(*item_workers)
+            for _ in download_workers:
+                await downloads.put(None)
+            await asyncio.gather(*download_workers)
+
+        if self.browsers is not None:
+            self.browsers.close()
+        self.manifest.close()
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] = round(elapsed, 1)
+        print(f"\n✅ Done: {self.stats} — {self.stats['saved'] / elapsed:.2f} items/sec")
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent scraper for the curiosity.lib.harvard.edu button catalog.")
+    parser.add_argument("--pages", type=int, nargs=2, default=[1, 30], metavar=("FIRST", "LAST"))
+    parser.add_argument("--save-path", default=os.path.expanduser("~/Desktop/Harvard_Political_Buttons_round_2"))
+    parser.add_argument("--base-url", default=BASE_URL, help="Point at a local stub server to test without the real site")
+    parser.add_argument("--collection", default="political-buttons")
+    parser.add_argument("--per-page", type=int, default=96)
+    parser.add_argument("--concurrency", type=int, default=8, help="Open connections / workers per stage")
+    parser.add_argument("--rate", type=float, default=4.0, help="Maximum requests per second (0 = unlimited)")
+    parser.add_argument("--browser-workers", type=int, default=1, help="Headless Chrome fallbacks (0 = never use a browser)")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate already-downloaded items with conditional requests")
+    args = parser.parse_args()
+
+    engine = ScraperEngine(
+        args.save_path, base_url=args.base_url, collection=args.collection, per_page=args.per_page,
+        concurrency=args.concurrency, rate=args.rate, browser_workers=args.browser_workers,
+        refresh=args.refresh,
+    )
+    asyncio.run(engine.run(range(args.pages[0], args.pages[1] + 1)))
+
+
+if __name__ == "__main__":
+    main()
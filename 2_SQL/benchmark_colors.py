@@ -0,0 +1,45 @@
+import os
+import time
+import random
+import argparse
+import statistics
+import cv2
+from color_extraction import STRATEGIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-image latency of each dominant-color strategy.")
+    parser.add_argument("--folder", default="archive/", help="Folder containing images")
+    parser.add_argument("--sample", type=int, default=50, help="Number of images to time")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    args = parser.parse_args()
+
+    filenames = [f for f in os.listdir(args.folder) if f.endswith(".jpg") or f.endswith(".png")]
+    random.seed(0)
+    filenames = random.sample(filenames, min(args.sample, len(filenames)))
+    # Decode up front so only color extraction is timed
+    images = [cv2.imread(os.path.join(args.folder, f)) for f in filenames]
+    images = [img for img in images if img is not None]
+
+    print(f"🔎 Timing {len(images)} images\n")
+    print(f"{'strategy':<10} {'mean ms':>10} {'median ms':>10} {'max ms':>10}")
+    means = {}
+    for name in args.strategies:
+        extract = STRATEGIES[name]
+        timings = []
+        for img in images:
+            start = time.perf_counter()
+            extract(img)
+            timings.append((time.perf_counter() - start) * 1000)
+        means[name] = statistics.mean(timings)
+        print(f"{name:<10} {means[name]:>10.2f} {statistics.median(timings):>10.2f} {max(timings):>10.2f}")
+
+    if "legacy" in means:
+        print("\nSpeed-up over legacy:")
+        for name, mean_ms in means.items():
+            if name != "legacy":
+                print(f"  {name}: {means['legacy'] / mean_ms:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import time
+import sqlite3
+import argparse
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+from migrate_db import migrate
+from perceptual_hash import image_hashes
+
+# Rows updated per transaction
+BATCH_SIZE = 500
+
+
+def file_hashes(img_path):
+    """Worker: {"ahash", "dhash", "phash"} of one image file."""
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError("could not decode image")
+    return image_hashes(img)
+
+
+def save_hashes(conn, rows):
+    with conn:
+        conn.executemany("UPDATE images SET ahash = :ahash, dhash = :dhash, phash = :phash WHERE id = :id", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the perceptual hash columns for images ingested before they existed (used by /images/{id}/similar)."
+    )
+    parser.add_argument("--db", default="images2.db")
+    parser.add_argument("--folder", default="archive/", help="Folder containing images")
+    parser.add_argument("--all", action="store_true", help="Rehash every image, not only the missing ones")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    missing = "" if args.all else "AND phash IS NULL"
+    rows = [
+        (image_id, filename)
+        for image_id, filename in conn.execute(f"SELECT id, filename FROM images WHERE filename IS NOT NULL {missing}")
+        if os.path.exists(os.path.join(args.folder, filename))
+    ]
+    print(f"🔎 {len(rows)} images to hash with {args.workers} workers")
+
+    start = time.perf_counter()
+    done = failed = 0
+    ready = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        paths = [os.path.join(args.folder, filename) for _, filename in rows]
+        futures = [pool.submit(file_hashes, path) for path in paths]
+        for (image_id, filename), future in zip(rows, futures):
+            try:
+                ready.append({"id": image_id, **future.result()})
+            except Exception as e:
+                failed += 1
+                print(f"❌ Failed: {filename} ({e})")
+                continue
+            if len(ready) == BATCH_SIZE:
+                save_hashes(conn, ready)
+                done += len(ready)
+                ready = []
+                print(f"✅ {done} / {len(rows)}")
+    save_hashes(conn, ready)
+    done += len(ready)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {done} images hashed ({failed} failed) in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+
+# Same pack format the API serves from (PACKED_STORE=1)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from image_pack import PACK_MAGIC, blob_path, read_index, write_index
+
+
+def scan_archive(folder):
+    """filename -> (size, mtime_ns) of every image file in the archive folder."""
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith("."):
+                st = entry.stat()
+                files[entry.name] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pack the archive images into one append-only file the API can serve from (PACKED_STORE=1)."
+    )
+    parser.add_argument("--folder", default="archive/", help="Folder containing images")
+    parser.add_argument("--pack", default="archive.pack", help="Pack name: the index is <pack>.idx, the blob it names sits next to it")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Write a fresh pack, dropping the bytes of files that were removed or changed since")
+    args = parser.parse_args()
+
+    index = read_index(args.pack)
+    old_blob = blob_path(args.pack, index)
+    if args.rebuild:
+        # A new blob under a new name: servers keep using the old one until the index is replaced
+        index = {"blob": f"{os.path.basename(args.pack)}.{time.time_ns()}", "pack_size": 0, "files": {}}
+    pack_path = blob_path(args.pack, index)
+    files = index["files"]
+    stats = scan_archive(args.folder)
+
+    # Files already packed with the same size and mtime are kept as they are
+    removed = [name for name in files if name not in stats]
+    for name in removed:
+        del files[name]
+    todo = sorted(name for name, (size, mtime_ns) in stats.items()
+                  if name not in files or (files[name][2], files[name][3]) != (size, mtime_ns))
+    print(f"🔎 {len(stats)} files in {args.folder}: {len(todo)} to pack, {len(removed)} removed")
+
+    start = time.perf_counter()
+    by_hash = {entry[0]: entry for entry in files.values()}
+    added = reused = 0
+    with open(pack_path, "ab") as pack:
+        # Anything past the indexed size is left over from an interrupted run: overwrite it
+        pack.truncate(index["pack_size"])
+        pack.seek(index["pack_size"])
+        if index["pack_size"] == 0:
+            pack.write(PACK_MAGIC)
+        for name in todo:
+            with open(os.path.join(args.folder, name), "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            size, mtime_ns = len(data), stats[name][1]
+            if digest in by_hash:
+                # Identical bytes under another name (or a re-saved file) share one copy
+                files[name] = [digest, by_hash[digest][1], size, mtime_ns]
+                reused += 1
+                continue
+            files[name] = by_hash[digest] = [digest, pack.tell(), size, mtime_ns]
+            pack.write(data)
+            added += 1
+        pack.flush()
+        os.fsync(pack.fileno())
+        index["pack_size"] = pack.tell()
+    # The index goes last and is the only commit point: until it is replaced, readers only
+    # see the blob and the bytes it already covered
+    write_index(args.pack, index)
+
+    if args.rebuild and os.path.exists(old_blob):
+        # Servers that still map it keep reading it until they switch to the new index
+        os.remove(old_blob)
+
+    elapsed = time.perf_counter() - start
+    live = sum(entry[2] for entry in {entry[0]: entry for entry in files.values()}.values())
+    print(f"✅ {added} files packed, {reused} shared with identical files, in {elapsed:.1f}s")
+    print(f"✅ {args.pack}: {len(files)} files, {index['pack_size'] / (1 << 20):.1f} MB "
+          f"({(index['pack_size'] - live) / (1 << 20):.1f} MB no longer referenced; --rebuild drops it)")
+
+
+if __name__ == "__main__":
+    main()
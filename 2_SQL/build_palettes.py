@@ -0,0 +1,80 @@
+import os
+import time
+import sqlite3
+import argparse
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+from migrate_db import hex_to_lab, migrate
+from color_extraction import kmeans_palette
+
+# Palettes written per transaction
+BATCH_SIZE = 200
+
+
+def image_palette(img_path, k):
+    """Worker: [(rank, hex, weight, L, a, b), ...] for one image file."""
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError("could not decode image")
+    return [(rank, color, float(weight), *hex_to_lab(color)) for rank, (color, weight) in enumerate(kmeans_palette(img, k))]
+
+
+def save_palettes(conn, palettes):
+    with conn:
+        conn.executemany("DELETE FROM palettes WHERE image_id = ?", [(image_id,) for image_id, _ in palettes])
+        conn.executemany(
+            "INSERT INTO palettes (image_id, rank, color, weight, lab_l, lab_a, lab_b) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(image_id, *entry) for image_id, palette in palettes for entry in palette],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the palettes table for images ingested before palettes were stored (used by /images/similar-color)."
+    )
+    parser.add_argument("--db", default="images2.db")
+    parser.add_argument("--folder", default="archive/", help="Folder containing images")
+    parser.add_argument("--k", type=int, default=4, help="Colors per palette")
+    parser.add_argument("--all", action="store_true", help="Rebuild every palette, not only the missing ones")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    missing = "" if args.all else "AND id NOT IN (SELECT image_id FROM palettes)"
+    rows = [
+        (image_id, filename)
+        for image_id, filename in conn.execute(f"SELECT id, filename FROM images WHERE filename IS NOT NULL {missing}")
+        if os.path.exists(os.path.join(args.folder, filename))
+    ]
+    print(f"🔎 {len(rows)} palettes to build with {args.workers} workers")
+
+    start = time.perf_counter()
+    done = failed = 0
+    ready = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        paths = [os.path.join(args.folder, filename) for _, filename in rows]
+        futures = [pool.submit(image_palette, path, args.k) for path in paths]
+        for (image_id, filename), future in zip(rows, futures):
+            try:
+                palette = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ Failed: {filename} ({e})")
+                continue
+            ready.append((image_id, palette))
+            if len(ready) == BATCH_SIZE:
+                save_palettes(conn, ready)
+                done += len(ready)
+                ready = []
+                print(f"✅ {done} / {len(rows)}")
+    save_palettes(conn, ready)
+    done += len(ready)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {done} palettes stored ({failed} failed) in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# The rendition code lives with the backend so the API and this batch stage produce identical files
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from archive_index import ArchiveIndex
+from renditions import RENDITION_FORMATS, RENDITION_WIDTHS, RenditionCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-build resized renditions of every archive image.")
+    parser.add_argument("--archive", default="archive/", help="Folder with the original images")
+    parser.add_argument("--cache", default="cache/renditions/", help="Where renditions are written")
+    parser.add_argument("--widths", type=int, nargs="+", default=list(RENDITION_WIDTHS))
+    parser.add_argument("--formats", nargs="+", default=list(RENDITION_FORMATS), choices=list(RENDITION_FORMATS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    archive = ArchiveIndex(os.path.abspath(args.archive))
+    archive.refresh()
+    cache = RenditionCache(archive, os.path.abspath(args.cache))
+    filenames = [f for f in archive.files if f.endswith(".jpg") or f.endswith(".png")]
+
+    def build(filename):
+        try:
+            return cache.build(filename, args.widths, args.formats)
+        except Exception as e:
+            print(f"❌ {filename}: {e}")
+            return 0
+
+    start = time.perf_counter()
+    # OpenCV releases the GIL while decoding/resizing/encoding, so threads scale here
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        written = sum(pool.map(build, filenames))
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {written} renditions written for {len(filenames)} images in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
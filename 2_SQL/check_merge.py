@@ -0,0 +1,140 @@
+import os
+import sys
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from migrate_db import migrate
+
+MERGE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "merge_db.py")
+
+
+def copy_catalog(source, path):
+    """A migrated copy of the catalog; the source database is only read."""
+    shutil.copyfile(source, path)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    return conn
+
+
+def populate(conn):
+    """Give every image hashes, OCR words and a palette, like a fully built catalog."""
+    conn.execute("UPDATE images SET ahash = 'a' || id, dhash = 'd' || id, phash = 'p' || id, ocr_version = 'v1'")
+    conn.execute("DELETE FROM ocr_words")
+    conn.execute("DELETE FROM palettes")
+    conn.execute("""
+        INSERT INTO ocr_words (image_id, word_num, word, conf, left, top, width, height)
+        SELECT id, 1, 'word' || id, 90, 0, 0, 10, 10 FROM images
+    """)
+    conn.execute("""
+        INSERT INTO palettes (image_id, rank, color, weight, lab_l, lab_a, lab_b)
+        SELECT id, n.rank, color, 0.25, lab_l, lab_a, lab_b FROM images, (SELECT 1 AS rank UNION SELECT 2) AS n
+    """)
+    conn.commit()
+
+
+def snapshot(conn):
+    return {
+        "phash": conn.execute("SELECT COUNT(phash) FROM images").fetchone()[0],
+        "lab": conn.execute("SELECT COUNT(lab_l) FROM images").fetchone()[0],
+        "ocr_text": conn.execute("SELECT COUNT(ocr_version) FROM images").fetchone()[0],
+        "ocr_words": conn.execute("SELECT COUNT(*) FROM ocr_words").fetchone()[0],
+        "palettes": conn.execute("SELECT COUNT(*) FROM palettes").fetchone()[0],
+    }
+
+
+def merge(main_path, *shards):
+    result = subprocess.run([sys.executable, MERGE_DB, "--db", main_path, *shards], capture_output=True, text=True)
+    if result.returncode:
+        print(result.stdout + result.stderr)
+        raise SystemExit("❌ merge_db.py failed")
+    return result.stdout.strip().splitlines()[-1]
+
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge partial and newer shards into a copy of the catalog and check that nothing is lost."
+    )
+    parser.add_argument("--db", default="images2.db", help="Catalog to copy (left untouched)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="merge_check_")
+    ok = True
+    try:
+        main_path = os.path.join(workdir, "main.db")
+        conn = copy_catalog(args.db, main_path)
+        populate(conn)
+        first, second = [row[0] for row in conn.execute("SELECT filename FROM images ORDER BY id LIMIT 2")]
+        # One gap main should get filled in from a shard
+        conn.execute("UPDATE images SET phash = NULL WHERE filename = ?", (second,))
+        conn.commit()
+        before = snapshot(conn)
+        conn.close()
+
+        # An older, partial shard: same images, but no hashes, Lab colors, OCR or palettes
+        partial_path = os.path.join(workdir, "partial.db")
+        shard = copy_catalog(args.db, partial_path)
+        shard.execute("UPDATE images SET ahash = NULL, dhash = NULL, phash = NULL, lab_l = NULL, lab_a = NULL, lab_b = NULL, "
+                      "ocr_text = NULL, ocr_version = NULL")
+        shard.execute("DELETE FROM ocr_words")
+        shard.execute("DELETE FROM palettes")
+        shard.commit()
+        shard.close()
+
+        summary = merge(main_path, partial_path)
+        conn = sqlite3.connect(main_path)
+        ok &= check(snapshot(conn) == before, f"partial shard erased nothing: {snapshot(conn)}")
+        ok &= check("0 inserted, 0 updated" in summary, f"partial shard changed no rows ({summary})")
+        conn.close()
+
+        # A newer shard: the first image replaced and re-OCRed, a phash main is missing, one new image
+        newer_path = os.path.join(workdir, "newer.db")
+        shard = copy_catalog(main_path, newer_path)
+        shard.execute("UPDATE images SET content_hash = 'new-hash', phash = 'p-new', ocr_version = 'v2', ocr_text = 'new text' "
+                      "WHERE filename = ?", (first,))
+        shard.execute("DELETE FROM ocr_words WHERE image_id = (SELECT id FROM images WHERE filename = ?)", (first,))
+        shard.execute("DELETE FROM palettes WHERE image_id = (SELECT id FROM images WHERE filename = ?)", (first,))
+        shard.execute("INSERT INTO ocr_words (image_id, word_num, word, conf, left, top, width, height) "
+                      "SELECT id, 1, 'new', 95, 0, 0, 10, 10 FROM images WHERE filename = ?", (first,))
+        shard.execute("UPDATE images SET phash = 'p-filled' WHERE filename = ?", (second,))
+        shard.execute("INSERT INTO images (title, filename, content_hash, phash) VALUES ('New button', 'new-button.jpg', 'added', 'p-added')")
+        shard.commit()
+        shard.close()
+        # Shards are inputs: the merge must leave them as they were
+        with open(newer_path, "rb") as f:
+            shard_bytes = f.read()
+
+        summary = merge(main_path, newer_path)
+        conn = sqlite3.connect(main_path)
+        ok &= check("1 inserted, 2 updated" in summary, f"newer shard: 1 inserted, 2 updated ({summary})")
+        row = conn.execute("SELECT id, content_hash, phash, ocr_text FROM images WHERE filename = ?", (first,)).fetchone()
+        ok &= check(row[1:] == ("new-hash", "p-new", "new text"), f"replaced image takes the shard's hash and OCR: {row[1:]}")
+        words = conn.execute("SELECT word FROM ocr_words WHERE image_id = ?", (row[0],)).fetchall()
+        ok &= check(words == [("new",)], f"replaced image has the shard's OCR words: {words}")
+        palettes = conn.execute("SELECT COUNT(*) FROM palettes WHERE image_id = ?", (row[0],)).fetchone()[0]
+        ok &= check(palettes == 0, "replaced image dropped the old image's palette")
+        filled = conn.execute("SELECT phash FROM images WHERE filename = ?", (second,)).fetchone()[0]
+        ok &= check(filled == "p-filled", "missing phash filled in from the shard")
+        ok &= check(conn.execute("SELECT COUNT(*) FROM images WHERE filename = 'new-button.jpg'").fetchone()[0] == 1,
+                    "new image inserted")
+        after = snapshot(conn)
+        ok &= check(after["palettes"] == before["palettes"] - 2 and after["ocr_words"] == before["ocr_words"],
+                    f"other images kept their OCR words and palettes: {after}")
+        conn.close()
+        with open(newer_path, "rb") as f:
+            ok &= check(f.read() == shard_bytes, "shard file left unchanged")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("✅ Merge check passed" if ok else "❌ Merge check failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import sqlite3
+import argparse
+
+# Check the exact SQL the API runs, so the queries and the indexes can't drift apart
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from queries import ImageQuery
+
+# Filter combinations the frontend sends to /images (the keyset cursor is added to each)
+CASES = {
+    "no filters": {},
+    "date range": {"min_date": 1940, "max_date": 2000},
+    "min date only": {"min_date": 1960},
+    "political campaigns": {"type": "political-campaigns"},
+    "other types": {"type": "other"},
+    "type + date": {"type": "political-campaigns", "min_date": 1940, "max_date": 2000},
+    "hue": {"selected_hue": 120.0, "hue_tolerance": 10.0},
+    "hue wrapping 0": {"selected_hue": 5.0, "hue_tolerance": 10.0},
+    "type + hue + date": {"type": "political-campaigns", "selected_hue": 200.0, "min_date": 1940, "max_date": 2000},
+    "title keyword": {"keyword": "kennedy"},
+}
+
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if any /images query sorts in a temp B-tree instead of reading an index in order."
+    )
+    parser.add_argument("--db", default="images2.db")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    failures = 0
+    for name, filters in CASES.items():
+        query = ImageQuery(**filters)
+        for after in (None, (4.5, 100)):
+            sql, params = query.select(after=after, limit=51)
+            plan = query_plan(conn, sql, params)
+            label = name + (" (next page)" if after else "")
+            if any("TEMP B-TREE" in step for step in plan):
+                failures += 1
+                print(f"❌ {label}: {' | '.join(plan)}")
+            else:
+                print(f"✅ {label}: {' | '.join(plan)}")
+    conn.close()
+
+    # Relevance-ranked full-text search sorts by bm25(), which no index can provide; not checked
+    if failures:
+        print(f"❌ {failures} queries sort in a temp B-tree")
+        sys.exit(1)
+    print("✅ Every /images query reads rows in index order")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+# Images are shrunk to this size (px) before any color work; 800x800 -> 64x64 is 156x fewer pixels
+SAMPLE_SIZE = 64
+
+# Hue / saturation / value bins for the histogram strategy (OpenCV hue runs 0-179)
+HSV_BINS = (18, 4, 4)
+
+
+def to_hex(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*(int(round(c)) for c in rgb))
+
+
+def button_mask(height, width, inset=0.9):
+    """
+    Boolean mask of the centre disc of the image. Buttons are photographed as circles on
+    a (usually white) background, and the rim is often shadowed; both are left out.
+    """
+    yy, xx = np.ogrid[:height, :width]
+    cy, cx = (height - 1) / 2, (width - 1) / 2
+    radius = inset * min(height, width) / 2
+    return (yy - cy) ** 2 + (xx - cx) ** 2 <= radius ** 2
+
+
+def sample_pixels(img, mask_border=True):
+    """Downsample a BGR image and return its (masked) pixels as an (N, 3) RGB array."""
+    small = cv2.resize(img, (SAMPLE_SIZE, SAMPLE_SIZE), interpolation=cv2.INTER_AREA)
+    small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    if mask_border:
+        return small[button_mask(SAMPLE_SIZE, SAMPLE_SIZE)]
+    return small.reshape((-1, 3))
+
+
+def mean_color(img, mask_border=True):
+    """
+    Average color of a downsampled copy. With mask_border=False this is (to rounding) what
+    KMeans(k=1) over the full image gives, i.e. the legacy extractor, at a fraction of the
+    cost; the default leaves out the background and rim, so it differs.
+    """
+    return to_hex(sample_pixels(img, mask_border).mean(axis=0))
+
+
+def hsv_mode_color(img, mask_border=True):
+    """Most common color: the fullest bin of an HSV histogram, reported as the mean RGB of its pixels."""
+    rgb = sample_pixels(img, mask_border)
+    hsv = cv2.cvtColor(rgb.reshape((-1, 1, 3)), cv2.COLOR_RGB2HSV).reshape((-1, 3)).astype(np.int32)
+    h_bins, s_bins, v_bins = HSV_BINS
+    bins = (
+        hsv[:, 0] * h_bins // 180 * s_bins * v_bins
+        + hsv[:, 1] * s_bins // 256 * v_bins
+        + hsv[:, 2] * v_bins // 256
+    )
+    mode = np.bincount(bins).argmax()
+    return to_hex(rgb[bins == mode].mean(axis=0))
+
+
+def kmeans_palette(img, k=4, mask_border=True, random_state=0):
+    """
+    Cluster the downsampled pixels into k colors with mini-batch k-means.
+    Returns [(hex, share of pixels), ...] sorted from most to least common.
+    """
+    pixels = sample_pixels(img, mask_border).astype(np.float32)
+    k = min(k, len(np.unique(pixels, axis=0)))
+    kmeans = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=1, batch_size=1024)
+    labels = kmeans.fit_predict(pixels)
+    counts = np.bincount(labels, minlength=k)
+    order = np.argsort(-counts)
+    return [(to_hex(kmeans.cluster_centers_[i]), counts[i] / counts.sum()) for i in order]
+
+
+def kmeans_color(img, k=4, mask_border=True):
+    """Center of the largest k-means cluster."""
+    return kmeans_palette(img, k, mask_border)[0][0]
+
+
+def legacy_kmeans_color(img):
+    """The original extractor: KMeans(k=1, n_init=10) over every full-resolution pixel. Kept for benchmarks."""
+    pixels = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).reshape((-1, 3))
+    kmeans = KMeans(n_clusters=1, random_state=0, n_init=10)
+    kmeans.fit(pixels)
+    return "#{:02x}{:02x}{:02x}".format(*(int(c) for c in kmeans.cluster_centers_[0]))
+
+
+STRATEGIES = {
+    "mean": mean_color,
+    "hsv_mode": hsv_mode_color,
+    "kmeans": kmeans_color,
+    "legacy": legacy_kmeans_color,
+}
+
+# Rows loaded before this default existed were colored with "legacy"; load_images.py --recolor
+# recomputes them so the hue filter compares every row by the same definition
+DEFAULT_STRATEGY = "kmeans"
+
+
+def extract_dominant_color(img, strategy=DEFAULT_STRATEGY):
+    """Dominant color of a decoded (BGR) image as a hex string, using one of STRATEGIES."""
+    return STRATEGIES[strategy](img)
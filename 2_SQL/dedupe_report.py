@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+
+# Same hash index the API uses for /images/{id}/similar
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from hash_index import MultiIndexHash, hamming
+
+
+def find_groups(rows, max_phash, max_dhash):
+    """
+    Groups of images whose pHash AND dHash are both within the thresholds of another image
+    in the group (single linkage). Returns lists of row dicts, biggest groups first.
+    """
+    index = MultiIndexHash()
+    for row in rows:
+        index.add(row["phash"], row["id"])
+    by_id = {row["id"]: row for row in rows}
+
+    # Union-find over the matching pairs
+    parent = {row["id"]: row["id"] for row in rows}
+
+    def find(image_id):
+        while parent[image_id] != image_id:
+            parent[image_id] = parent[parent[image_id]]
+            image_id = parent[image_id]
+        return image_id
+
+    for row in rows:
+        for distance, other in index.search(row["phash"], max_phash):
+            if other != row["id"] and hamming(row["dhash"], by_id[other]["dhash"]) <= max_dhash:
+                parent[find(other)] = find(row["id"])
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(find(row["id"]), []).append(row)
+    return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g[0]["id"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report visually near-identical images (perceptual hashes) for review.")
+    parser.add_argument("--db", default="images2.db")
+    parser.add_argument("--folder", default="archive/", help="Folder containing images (for file sizes)")
+    parser.add_argument("--max-phash", type=int, default=6, help="Maximum pHash distance (bits out of 64)")
+    parser.add_argument("--max-dhash", type=int, default=10, help="Maximum dHash distance, checked as well to cut false matches")
+    parser.add_argument("--json", help="Also write the groups to this JSON file")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    rows = [
+        {**dict(row), "phash": int(row["phash"], 16), "dhash": int(row["dhash"], 16)}
+        for row in conn.execute(
+            "SELECT id, title, date, type, dimension, filename, phash, dhash FROM images "
+            "WHERE phash IS NOT NULL AND dhash IS NOT NULL"
+        )
+    ]
+    missing = conn.execute("SELECT COUNT(*) FROM images WHERE phash IS NULL").fetchone()[0]
+    conn.close()
+    if missing:
+        print(f"⚠️ {missing} images have no hashes yet (run build_hashes.py)")
+
+    groups = find_groups(rows, args.max_phash, args.max_dhash)
+    reclaimable = 0
+    report = []
+    for group in groups:
+        for row in group:
+            path = os.path.join(args.folder, row["filename"] or "")
+            row["bytes"] = os.path.getsize(path) if row["filename"] and os.path.exists(path) else 0
+        # Keeping the biggest file of each group (usually the best scan) frees the rest
+        keep = max(group, key=lambda row: row["bytes"])
+        reclaimable += sum(row["bytes"] for row in group if row is not keep)
+
+        print(f"\n📄 {len(group)} images:")
+        for row in group:
+            distance = hamming(row["phash"], keep["phash"])
+            print(f"   {'keep' if row is keep else f'{distance:>4}'}  #{row['id']:<6} {row['filename']} ({row['bytes'] // 1024} KB)")
+        report.append({
+            "keep": keep["id"],
+            "images": [
+                {"id": row["id"], "filename": row["filename"], "bytes": row["bytes"],
+                 "phash_distance": hamming(row["phash"], keep["phash"]), "dhash_distance": hamming(row["dhash"], keep["dhash"])}
+                for row in group
+            ],
+        })
+
+    duplicates = sum(len(group) - 1 for group in groups)
+    print(f"\n✅ {len(groups)} groups, {duplicates} possible duplicates, {reclaimable / (1 << 20):.1f} MB reclaimable")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"max_phash": args.max_phash, "max_dhash": args.max_dhash, "groups": report}, f, indent=2)
+        print(f"✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import sqlite3
+from migrate_db import migrate
 
 # Connect to database (or create if it doesn't exist)
 conn = sqlite3.connect("images2.db")
@@ -24,10 +25,29 @@ cursor.execute('''
         type TEXT,
         dimension TEXT,
         color TEXT,
-        ocr_text TEXT
+        ocr_text TEXT,
+        hue REAL,
+        saturation REAL,
+        lightness REAL,
+        filename TEXT,
+        content_hash TEXT,
+        ocr_version TEXT,
+        year INTEGER,
+        diameter_cm REAL,
+        collection_id INTEGER REFERENCES collections (id),
+        lab_l REAL,
+        lab_a REAL,
+        lab_b REAL,
+        ahash TEXT,
+        dhash TEXT,
+        phash TEXT
     )
 ''')
 
+# Indexes, the full-text index, ocr_words, palettes and the collections lookup table come from
+# the same versioned migrations used to upgrade existing databases
+migrate(conn)
+
 
 conn.commit()
 conn.close()
@@ -1,71 +1,309 @@
 import os
+import time
+import hashlib
+import itertools
+import argparse
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
 import sqlite3
-import pytesseract
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import ocr
+from perceptual_hash import image_hashes
+from migrate_db import hex_to_hsl, hex_to_lab, typed_columns
+from color_extraction import DEFAULT_STRATEGY, STRATEGIES, extract_dominant_color, kmeans_palette
 
 
-# Function to extract dominant color
-def extract_dominant_color(image_path, k=1):
-    """Extract the dominant color of an image using K-Means clustering."""
-    img = cv2.imread(image_path)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  # Convert BGR to RGB
-    img = img.reshape((-1, 3))  # Reshape to list of pixels
-
-    # Use sklearn KMeans instead of cv2.KMeans
-    kmeans = KMeans(n_clusters=k, random_state=0, n_init=10)
-    kmeans.fit(img)
-    dominant_color = kmeans.cluster_centers_[0]  # Most dominant color
-
-    # Convert to HEX format
-    return "#{:02x}{:02x}{:02x}".format(int(dominant_color[0]), int(dominant_color[1]), int(dominant_color[2]))
-
 # Function to convert "na" values to None (NULL)
 def clean_value(value):
     return None if value.lower() == "na" else value
 
-def extract_text(image_path):
-    img = cv2.imread(image_path)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    text = pytesseract.image_to_string(gray)
-    return text.strip()
+# Function to split "title_date_type_dimension.jpg" into its (cleaned) fields
+def parse_filename(filename):
+    parts = filename.replace(".jpg", "").replace(".png", "").split("_")
+    if len(parts) < 4:
+        return None
+    return tuple(clean_value(part) for part in parts[:4])
+
+def image_colors(img, color_strategy=DEFAULT_STRATEGY):
+    """Color, HSL, Lab and k-means palette columns of a decoded image."""
+    # The palette's largest cluster is exactly what the "kmeans" strategy picks
+    palette = kmeans_palette(img)
+    color = palette[0][0] if color_strategy == "kmeans" else extract_dominant_color(img, color_strategy)
+    hue, saturation, lightness = hex_to_hsl(color)
+    lab_l, lab_a, lab_b = hex_to_lab(color)
+    return {
+        "color": color,
+        "hue": hue,
+        "saturation": saturation,
+        "lightness": lightness,
+        "lab_l": lab_l,
+        "lab_a": lab_a,
+        "lab_b": lab_b,
+        "palette": [(rank, c, float(weight), *hex_to_lab(c)) for rank, (c, weight) in enumerate(palette)],
+    }
+
+def process_image(img_path, color_strategy=DEFAULT_STRATEGY, preprocess=ocr.DEFAULT_PREPROCESS):
+    """
+    Worker: read and decode one image once, extract its color and hashes and write the OCR input
+    to the preprocessing cache. Runs in a separate process, so it only gets a path and
+    returns plain values; OCR itself runs later, many images per tesseract call.
+    """
+    with open(img_path, "rb") as f:
+        data = f.read()
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("could not decode image")
+
+    content_hash = hashlib.sha256(data).hexdigest()
+    return {
+        "content_hash": content_hash,
+        **image_colors(img, color_strategy),
+        **image_hashes(img),
+        "ocr_input": ocr.cached_input(img, content_hash, preprocess),
+    }
 
-# Connect to the database
-conn = sqlite3.connect("images2.db")
-cursor = conn.cursor()
+def recolor_image(img_path, color_strategy=DEFAULT_STRATEGY):
+    """Worker for --recolor: only the color columns and palette of an already loaded image."""
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError("could not decode image")
+    return image_colors(img, color_strategy)
 
-# Folder containing images
-image_folder = "archive/"
+def prepare_ocr_input(img_path, content_hash, preprocess=ocr.DEFAULT_PREPROCESS):
+    """Worker for rows that only need new OCR: the image is decoded only on a cache miss."""
+    try:
+        return {"ocr_input": ocr.cached_input(None, content_hash, preprocess)}
+    except FileNotFoundError:
+        img = cv2.imread(img_path)
+        if img is None:
+            raise ValueError("could not decode image")
+        return {"ocr_input": ocr.cached_input(img, content_hash, preprocess)}
 
-# Loop through images and insert extracted data
-for filename in os.listdir(image_folder):
-    if filename.endswith(".jpg") or filename.endswith(".png"):
-        img_path = os.path.join(image_folder, filename)
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-        # Extract metadata from filename
-        parts = filename.replace(".jpg", "").replace(".png", "").split("_")
+def find_pending(cursor, image_folder):
+    """
+    Work out which archive files still need processing. A file is skipped when a row
+    with the same filename and content hash exists. Rows ingested before hashes were
+    stored (content_hash IS NULL) just get their hash filled in.
+    """
+    cursor.execute("SELECT id, filename, content_hash FROM images WHERE filename IS NOT NULL")
+    ingested = {filename: (image_id, content_hash) for image_id, filename, content_hash in cursor.fetchall()}
 
-        if len(parts) < 4:
+    pending, backfill = [], []
+    for filename in sorted(os.listdir(image_folder)):
+        if not (filename.endswith(".jpg") or filename.endswith(".png")):
+            continue
+        if parse_filename(filename) is None:
             print(f"❌ Skipping {filename} (Invalid format)")
-            continue  # Skip files with incorrect format
-
-        title = clean_value(parts[0])
-        date = clean_value(parts[1])
-        img_type = clean_value(parts[2])
-        dimension = clean_value(parts[3])
-        color = extract_dominant_color(img_path)
-        ocr_text = extract_text(img_path)  # OCR extraction
-
-        # Insert into database (NULL stored if value is None)
-        cursor.execute(
-            "INSERT INTO images (title, date, type, dimension, color, ocr_text) VALUES (?, ?, ?, ?, ?, ?)",
-            (title, date, img_type, dimension, color, ocr_text)
+            continue
+
+        known = ingested.get(filename)
+        if known is None:
+            pending.append((filename, None))
+            continue
+        image_id, known_hash = known
+        digest = file_sha256(os.path.join(image_folder, filename))
+        if known_hash is None:
+            backfill.append((digest, image_id))
+        elif known_hash != digest:
+            pending.append((filename, image_id))  # file was replaced: re-ingest into the same row
+    return pending, backfill
+
+def find_stale_ocr(cursor, image_folder, version, pending):
+    """Rows whose OCR came from another tesseract version or other settings (and aren't re-ingested anyway)."""
+    reingested = {filename for filename, _ in pending}
+    cursor.execute(
+        "SELECT id, filename, content_hash FROM images "
+        "WHERE filename IS NOT NULL AND content_hash IS NOT NULL AND (ocr_version IS NULL OR ocr_version != ?)",
+        (version,),
+    )
+    return [
+        (image_id, filename, content_hash)
+        for image_id, filename, content_hash in cursor.fetchall()
+        if filename not in reingested and os.path.exists(os.path.join(image_folder, filename))
+    ]
+
+def save_colors(conn, batch):
+    """Write recomputed colors and palettes of already loaded rows in one transaction."""
+    with conn:
+        conn.executemany(
+            "UPDATE images SET color = :color, hue = :hue, saturation = :saturation, lightness = :lightness, "
+            "lab_l = :lab_l, lab_a = :lab_a, lab_b = :lab_b WHERE id = :id",
+            batch,
+        )
+        conn.executemany("DELETE FROM palettes WHERE image_id = ?", [(r["id"],) for r in batch])
+        conn.executemany(
+            "INSERT INTO palettes (image_id, rank, color, weight, lab_l, lab_a, lab_b) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(r["id"], *entry) for r in batch for entry in r["palette"]],
+        )
+
+def save_batch(conn, batch):
+    """Write one batch of results (rows, their OCR words and palettes) in a single transaction."""
+    with conn:
+        for r in batch:
+            if r.get("ocr_only"):
+                conn.execute("UPDATE images SET ocr_text = :ocr_text, ocr_version = :ocr_version WHERE id = :id", r)
+                continue
+            r.update(typed_columns(conn.cursor(), r["date"], r["dimension"], r["type"]))
+            if r["id"] is None:
+                r["id"] = conn.execute(
+                    "INSERT INTO images (title, date, type, dimension, color, ocr_text, hue, saturation, lightness, "
+                    "filename, content_hash, ocr_version, year, diameter_cm, collection_id, lab_l, lab_a, lab_b, "
+                    "ahash, dhash, phash) "
+                    "VALUES (:title, :date, :type, :dimension, :color, :ocr_text, :hue, :saturation, :lightness, "
+                    ":filename, :content_hash, :ocr_version, :year, :diameter_cm, :collection_id, :lab_l, :lab_a, :lab_b, "
+                    ":ahash, :dhash, :phash)",
+                    r,
+                ).lastrowid
+            else:
+                conn.execute(
+                    "UPDATE images SET title = :title, date = :date, type = :type, dimension = :dimension, color = :color, "
+                    "ocr_text = :ocr_text, hue = :hue, saturation = :saturation, lightness = :lightness, "
+                    "content_hash = :content_hash, ocr_version = :ocr_version, "
+                    "year = :year, diameter_cm = :diameter_cm, collection_id = :collection_id, "
+                    "lab_l = :lab_l, lab_a = :lab_a, lab_b = :lab_b, ahash = :ahash, dhash = :dhash, phash = :phash "
+                    "WHERE id = :id",
+                    r,
+                )
+        conn.executemany("DELETE FROM ocr_words WHERE image_id = ?", [(r["id"],) for r in batch])
+        conn.executemany(
+            "INSERT INTO ocr_words (image_id, word_num, word, conf, left, top, width, height) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(r["id"], *word) for r in batch for word in r["words"]],
         )
+        recolored = [r for r in batch if not r.get("ocr_only")]
+        conn.executemany("DELETE FROM palettes WHERE image_id = ?", [(r["id"],) for r in recolored])
+        conn.executemany(
+            "INSERT INTO palettes (image_id, rank, color, weight, lab_l, lab_a, lab_b) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(r["id"], *entry) for r in recolored for entry in r["palette"]],
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract color + OCR text for archive images and store them in SQLite.")
+    parser.add_argument("--db", default="images2.db")
+    parser.add_argument("--folder", default="archive/", help="Folder containing images")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--ocr-batch", type=int, default=ocr.OCR_BATCH_SIZE,
+                        help="Images per tesseract process (each batch is also one transaction)")
+    parser.add_argument("--color-strategy", default=DEFAULT_STRATEGY, choices=list(STRATEGIES),
+                        help="How the dominant color is picked (see color_extraction.py)")
+    parser.add_argument("--preprocess", default=ocr.DEFAULT_PREPROCESS, choices=ocr.PREPROCESS_MODES,
+                        help="How images are prepared for OCR; changing it re-OCRs every row")
+    parser.add_argument("--recolor", action="store_true",
+                        help="Recompute the color and palette of every loaded image with --color-strategy "
+                             "(run once after the default strategy changes, so all rows use the same one)")
+    args = parser.parse_args()
+
+    # Connect to the database
+    conn = sqlite3.connect(args.db)
+    cursor = conn.cursor()
+
+    pending, backfill = find_pending(cursor, args.folder)
+    if backfill:
+        with conn:
+            cursor.executemany("UPDATE images SET content_hash = ? WHERE id = ?", backfill)
+        print(f"✅ Stored content hashes for {len(backfill)} previously ingested images")
+
+    version = ocr.ocr_version(args.preprocess)
+    stale = find_stale_ocr(cursor, args.folder, version, pending)
+    recolor = []
+    if args.recolor:
+        reingested = {filename for filename, _ in pending}
+        cursor.execute("SELECT id, filename FROM images WHERE filename IS NOT NULL")
+        recolor = [
+            (image_id, filename) for image_id, filename in cursor.fetchall()
+            if filename not in reingested and os.path.exists(os.path.join(args.folder, filename))
+        ]
+    print(f"🔎 {len(pending)} images to process, {len(stale)} to re-OCR ({version}) and {len(recolor)} to recolor "
+          f"({args.color_strategy}) with {args.workers} workers")
+
+    # Decode, color and OCR preprocessing, one image per task
+    tasks = itertools.chain(
+        ((process_image, (os.path.join(args.folder, filename), args.color_strategy, args.preprocess),
+          {"id": image_id, "filename": filename}) for filename, image_id in pending),
+        ((recolor_image, (os.path.join(args.folder, filename), args.color_strategy),
+          {"id": image_id, "filename": filename, "recolor_only": True}) for image_id, filename in recolor),
+        ((prepare_ocr_input, (os.path.join(args.folder, filename), content_hash, args.preprocess),
+          {"id": image_id, "filename": filename, "ocr_only": True}) for image_id, filename, content_hash in stale),
+    )
+
+    start = time.perf_counter()
+    done, failed = 0, 0
+    ready, recolored, recolored_count = [], [], 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Only a few images are prepared ahead of OCR: each OCR batch (many images per tesseract
+        # process) is submitted as soon as it is full and committed as soon as it is done, so
+        # OCR overlaps decoding and a crash only loses the batches in flight
+        preparing, ocring = {}, {}
+        while True:
+            for fn, fn_args, row in itertools.islice(tasks, max(0, 2 * args.workers - len(preparing))):
+                preparing[pool.submit(fn, *fn_args)] = row
+            if not preparing and ready:
+                # Every image is prepared: OCR the last, partial batch
+                ocring[pool.submit(ocr.ocr_batch, [row["ocr_input"] for row in ready])] = ready
+                ready = []
+            if not preparing and not ocring:
+                break
+
+            finished, _ = wait([*preparing, *ocring], return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in ocring:
+                    batch = ocring.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        failed += len(batch)
+                        print(f"❌ OCR failed for {len(batch)} images ({e})")
+                        continue
+
+                    for row, result in zip(batch, results):
+                        row.update(ocr_text=result["text"], words=result["words"], ocr_version=version)
+                        if row.get("ocr_only"):
+                            print(f"🔁 Re-OCRed: {row['filename']} ({len(row['words'])} words)")
+                        else:
+                            print(f"✅ Added: {row['title']} | Date: {row['date']} | Type: {row['type']} | "
+                                  f"Dimension: {row['dimension']} | Color: {row['color']}")
+                    # Commit every batch so a crash only loses the batches in flight
+                    save_batch(conn, batch)
+                    done += len(batch)
+                    continue
+
+                row = preparing.pop(future)
+                try:
+                    row.update(future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Failed: {row['filename']} ({e})")
+                    continue
+                if row.get("recolor_only"):
+                    # No OCR needed: written straight away, a batch at a time
+                    recolored.append(row)
+                    recolored_count += 1
+                    if len(recolored) == args.ocr_batch:
+                        save_colors(conn, recolored)
+                        done += len(recolored)
+                        recolored = []
+                    continue
+                if not row.get("ocr_only"):
+                    title, date, img_type, dimension = parse_filename(row["filename"])
+                    row.update(title=title, date=date, type=img_type, dimension=dimension)
+                ready.append(row)
+                if len(ready) == args.ocr_batch:
+                    ocring[pool.submit(ocr.ocr_batch, [row["ocr_input"] for row in ready])] = ready
+                    ready = []
+        save_colors(conn, recolored)
+        done += len(recolored)
+        if recolor:
+            print(f"🎨 Recolored {recolored_count} images with {args.color_strategy}")
+
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {done} images loaded into the database ({failed} failed) in {elapsed:.1f}s — {rate:.2f} images/sec")
 
-        print(f"✅ Added: {title} | Date: {date} | Type: {img_type} | Dimension: {dimension} | Color: {color} | OCR: {ocr_text}")
 
-# Commit changes
-conn.commit()
-conn.close()
-print("✅ All images loaded into the database!")
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,193 @@
+import os
+import time
 import sqlite3
+import argparse
+import tempfile
+from urllib.parse import quote
+from migrate_db import MIGRATIONS, column_names, migrate
 
-# Paths to old and new databases
-MAIN_DB = "../backend/images.db"
-NEW_DB = "../backend/new_images.db"
+# Not copied as-is: ids are per database, and collection ids are looked up by name
+LOCAL_COLUMNS = {"id", "collection_id"}
+# Written by the OCR pass, together: only replaced by a shard that OCRed the image anew
+OCR_COLUMNS = {"ocr_text", "ocr_version"}
+# SQLite attaches at most 10 databases to one connection (SQLITE_MAX_ATTACHED)
+ATTACH_BATCH = 10
 
-# Connect to both databases
-main_conn = sqlite3.connect(MAIN_DB)
-new_conn = sqlite3.connect(NEW_DB)
 
-main_cursor = main_conn.cursor()
-new_cursor = new_conn.cursor()
+def read_only_uri(path):
+    return f"file:{quote(os.path.abspath(path))}?mode=ro"
 
-# Attach new database
-main_cursor.execute(f"ATTACH DATABASE '{NEW_DB}' AS new_db")
 
-# Insert data from new_db.images into images (avoiding duplicates)
-main_cursor.execute("""
-    INSERT INTO images SELECT * FROM new_db.images
-    WHERE id NOT IN (SELECT id FROM images);
-""")
+def schema_version(path):
+    conn = sqlite3.connect(read_only_uri(path), uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
 
-# Commit and close
-main_conn.commit()
-main_conn.close()
-new_conn.close()
 
-print("Databases merged successfully!")
+def readable_shard(path, workdir):
+    """
+    A path to read the shard from at the current schema. Shards are inputs and are never
+    changed: an older one is copied into `workdir` and the copy is migrated.
+    """
+    version = schema_version(path)
+    if version > len(MIGRATIONS):
+        raise SystemExit(f"❌ {path} has schema version {version}, newer than this script ({len(MIGRATIONS)})")
+    if version == len(MIGRATIONS):
+        return path
+    print(f"♻️ {path} is at schema version {version}: migrating a copy")
+    fd, copy_path = tempfile.mkstemp(dir=workdir, suffix=".db")
+    os.close(fd)
+    source = sqlite3.connect(read_only_uri(path), uri=True)
+    copy = sqlite3.connect(copy_path)
+    source.backup(copy)
+    source.close()
+    migrate(copy)
+    copy.close()
+    return copy_path
+
+
+def merge_shard(conn, alias, columns):
+    """
+    Merge one attached shard into the main images table, keyed on filename. A shard row only
+    replaces what main has when it is newer: another image under that filename (content_hash
+    differs) or another OCR run (ocr_version differs). Otherwise it only fills in columns, OCR
+    words and palettes main is missing, so an older or partial shard never erases anything.
+    Rows whose image (content hash) is already stored under another filename are skipped.
+    Returns (inserted, updated, skipped).
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"INSERT OR IGNORE INTO main.collections (name) SELECT DISTINCT type FROM {alias}.images WHERE type IS NOT NULL")
+
+    image_columns = [c for c in columns if c not in OCR_COLUMNS]
+    fills_gap_sql = " OR ".join(f"(m.{c} IS NULL AND s.{c} IS NOT NULL)" for c in image_columns)
+    # What each shard row brings, decided before anything is written. Rows with nothing new
+    # never reach the upsert, so they neither get rewritten nor use up AUTOINCREMENT ids
+    cursor.execute("DROP TABLE IF EXISTS temp.incoming")
+    cursor.execute(f"""
+        CREATE TEMP TABLE incoming AS
+        SELECT s.id AS shard_id, s.filename, m.id AS id, m.id IS NULL AS is_new,
+               m.id IS NULL OR m.content_hash IS NOT s.content_hash AS new_image,
+               m.id IS NULL OR m.content_hash IS NOT s.content_hash
+                   OR (s.ocr_version IS NOT NULL AND s.ocr_version IS NOT m.ocr_version) AS new_ocr
+        FROM {alias}.images AS s
+        LEFT JOIN main.images AS m ON m.filename = s.filename
+        WHERE s.filename IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM main.images AS o
+              WHERE o.content_hash = s.content_hash AND o.filename != s.filename
+          )
+          AND (m.id IS NULL OR m.content_hash IS NOT s.content_hash
+               OR (s.ocr_version IS NOT NULL AND s.ocr_version IS NOT m.ocr_version)
+               OR {fills_gap_sql}
+               OR (NOT EXISTS (SELECT 1 FROM main.ocr_words WHERE image_id = m.id)
+                   AND EXISTS (SELECT 1 FROM {alias}.ocr_words WHERE image_id = s.id))
+               OR (NOT EXISTS (SELECT 1 FROM main.palettes WHERE image_id = m.id)
+                   AND EXISTS (SELECT 1 FROM {alias}.palettes WHERE image_id = s.id)))
+    """)
+
+    # A new image replaces every image-derived column (hashes, colors, ...); the same image
+    # only fills gaps. OCR text and version travel together, and only with a newer OCR run
+    new_image = "excluded.content_hash IS NOT images.content_hash"
+    new_ocr = f"{new_image} OR (excluded.ocr_version IS NOT NULL AND excluded.ocr_version IS NOT images.ocr_version)"
+    update_sql = ", ".join(
+        [f"{c} = CASE WHEN {new_image} THEN excluded.{c} ELSE COALESCE(images.{c}, excluded.{c}) END"
+         for c in image_columns + ["collection_id"]]
+        + [f"{c} = CASE WHEN {new_ocr} THEN excluded.{c} ELSE images.{c} END" for c in columns if c in OCR_COLUMNS]
+    )
+    column_sql = ", ".join(columns)
+    source_sql = ", ".join(f"s.{c}" for c in columns)
+    cursor.execute(f"""
+        INSERT INTO main.images ({column_sql}, collection_id)
+        SELECT {source_sql}, (SELECT id FROM main.collections WHERE name = s.type)
+        FROM temp.incoming AS t
+        JOIN {alias}.images AS s ON s.id = t.shard_id
+        WHERE true
+        ON CONFLICT (filename) DO UPDATE SET {update_sql}
+    """)
+    cursor.execute("UPDATE temp.incoming SET id = (SELECT id FROM main.images WHERE filename = incoming.filename) WHERE id IS NULL")
+
+    # Per-word OCR rows follow the OCR text: replaced when it came from the shard, otherwise
+    # only added for images main has none for. Palettes follow the image the same way
+    for table, newer, row_columns in (
+        ("ocr_words", "new_ocr", ("word_num", "word", "conf", "left", "top", "width", "height")),
+        ("palettes", "new_image", ("rank", "color", "weight", "lab_l", "lab_a", "lab_b")),
+    ):
+        cursor.execute("DROP TABLE IF EXISTS temp.targets")
+        cursor.execute(f"""
+            CREATE TEMP TABLE targets AS
+            SELECT id, shard_id FROM temp.incoming AS t
+            WHERE t.{newer}
+               OR (NOT EXISTS (SELECT 1 FROM main.{table} WHERE image_id = t.id)
+                   AND EXISTS (SELECT 1 FROM {alias}.{table} WHERE image_id = t.shard_id))
+        """)
+        cursor.execute(f"DELETE FROM main.{table} WHERE image_id IN (SELECT id FROM temp.targets)")
+        cursor.execute(f"""
+            INSERT INTO main.{table} (image_id, {", ".join(row_columns)})
+            SELECT t.id, {", ".join(f"r.{c}" for c in row_columns)}
+            FROM temp.targets AS t
+            JOIN {alias}.{table} AS r ON r.image_id = t.shard_id
+        """)
+
+    cursor.execute("SELECT SUM(is_new), COUNT(*) FROM temp.incoming")
+    inserted, merged = cursor.fetchone()
+    inserted = inserted or 0
+    cursor.execute(f"SELECT COUNT(*) FROM {alias}.images")
+    total = cursor.fetchone()[0]
+    return inserted, merged - inserted, total - merged
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge images from one or more shard databases into a main database, deduplicating on filename."
+    )
+    parser.add_argument("shards", nargs="*", default=["../backend/new_images.db"],
+                        help="Databases to merge in (read only; older ones are migrated on a temporary copy)")
+    parser.add_argument("--db", default="../backend/images.db", help="Main database, updated in place")
+    args = parser.parse_args()
+
+    # Every database must be on the same schema before rows can be copied column by column.
+    # The main database is the one being updated, so it is migrated in place
+    main_conn = sqlite3.connect(args.db)
+    migrate(main_conn)
+    main_conn.close()
+
+    conn = sqlite3.connect(args.db, isolation_level=None, uri=True)
+    columns = sorted(column_names(conn.cursor(), "images") - LOCAL_COLUMNS)
+
+    start = time.perf_counter()
+    totals = [0, 0, 0]
+    with tempfile.TemporaryDirectory(prefix="merge_db_") as workdir:
+        try:
+            # Attached a batch at a time; each batch lands in one transaction. A failed batch is
+            # rolled back, and re-running the merge is safe: rows already merged are left alone
+            for batch_start in range(0, len(args.shards), ATTACH_BATCH):
+                batch = args.shards[batch_start:batch_start + ATTACH_BATCH]
+                # Copies are migrated before anything is attached, so a failure leaves nothing half done
+                sources = [readable_shard(path, workdir) for path in batch]
+                aliases = [f"shard{i}" for i in range(len(batch))]
+                for source, alias in zip(sources, aliases):
+                    conn.execute(f"ATTACH DATABASE ? AS {alias}", (read_only_uri(source),))
+                conn.execute("BEGIN")
+                try:
+                    for path, alias in zip(batch, aliases):
+                        counts = merge_shard(conn, alias, columns)
+                        totals = [t + c for t, c in zip(totals, counts)]
+                        print(f"✅ {path}: {counts[0]} inserted, {counts[1]} updated, {counts[2]} skipped")
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    for alias in aliases:
+                        conn.execute(f"DETACH DATABASE {alias}")
+        finally:
+            conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Databases merged in {elapsed:.2f}s: {totals[0]} inserted, {totals[1]} updated, {totals[2]} skipped")
+
+
+if __name__ == "__main__":
+    main()
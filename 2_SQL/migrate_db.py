@@ -0,0 +1,369 @@
+import os
+import re
+import sqlite3
+import sys
+
+# The API's own color conversions, so stored hues and Lab values match its filters bit for bit
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from colors import hex_to_hsl, hex_to_lab
+
+
+def column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def add_hsl_columns(conn):
+    """Add hue/saturation/lightness columns, fill them from `color` and index hue."""
+    cursor = conn.cursor()
+    existing = column_names(cursor, "images")
+    for column in ("hue", "saturation", "lightness"):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE images ADD COLUMN {column} REAL")
+
+    cursor.execute("SELECT id, color FROM images WHERE color IS NOT NULL AND hue IS NULL")
+    updates = [(*hex_to_hsl(color), image_id) for image_id, color in cursor.fetchall()]
+    cursor.executemany("UPDATE images SET hue = ?, saturation = ?, lightness = ? WHERE id = ?", updates)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_hue ON images (hue)")
+    print(f"✅ Filled hue/saturation/lightness for {len(updates)} images")
+
+
+def add_filename_column(conn):
+    """Store the archive filename so the backend doesn't rebuild it from title/date/type/dimension."""
+    cursor = conn.cursor()
+    if "filename" not in column_names(cursor, "images"):
+        cursor.execute("ALTER TABLE images ADD COLUMN filename TEXT")
+
+    # Same naming rule the scraper used: title_date_type_dimension.jpg with spaces as dashes
+    cursor.execute("""
+        UPDATE images
+        SET filename = REPLACE(
+            COALESCE(title, 'na') || '_' || COALESCE(date, 'na') || '_' ||
+            COALESCE(type, 'na') || '_' || COALESCE(dimension, 'na') || '.jpg',
+            ' ', '-')
+        WHERE filename IS NULL
+    """)
+    print(f"✅ Filled filename for {cursor.rowcount} images")
+
+
+def add_content_hash_column(conn):
+    """SHA-256 of the image file; load_images.py uses it to skip images it already processed."""
+    cursor = conn.cursor()
+    if "content_hash" not in column_names(cursor, "images"):
+        cursor.execute("ALTER TABLE images ADD COLUMN content_hash TEXT")
+
+
+def add_fts_index(conn):
+    """
+    FTS5 index over title + OCR text for keyword search, kept in sync with `images`
+    by triggers. Prefix indexes on 2 and 3 characters make "kenn*" style queries cheap.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'images_fts'")
+    created = cursor.fetchone() is None
+
+    cursor.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(
+            title, ocr_text,
+            content='images', content_rowid='id',
+            tokenize='unicode61', prefix='2 3'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS images_fts_insert AFTER INSERT ON images BEGIN
+            INSERT INTO images_fts (rowid, title, ocr_text) VALUES (new.id, new.title, new.ocr_text);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS images_fts_delete AFTER DELETE ON images BEGIN
+            INSERT INTO images_fts (images_fts, rowid, title, ocr_text) VALUES ('delete', old.id, old.title, old.ocr_text);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS images_fts_update AFTER UPDATE OF title, ocr_text ON images BEGIN
+            INSERT INTO images_fts (images_fts, rowid, title, ocr_text) VALUES ('delete', old.id, old.title, old.ocr_text);
+            INSERT INTO images_fts (rowid, title, ocr_text) VALUES (new.id, new.title, new.ocr_text);
+        END;
+    """)
+    if created:
+        cursor.execute("INSERT INTO images_fts (images_fts) VALUES ('rebuild')")
+        print("✅ Built full-text index over title and OCR text")
+
+
+def add_ocr_words(conn):
+    """
+    Per-word OCR output (confidence + bounding box) and the OCR version each row was
+    produced with, so load_images.py only re-OCRs rows whose engine or settings changed.
+    """
+    cursor = conn.cursor()
+    if "ocr_version" not in column_names(cursor, "images"):
+        cursor.execute("ALTER TABLE images ADD COLUMN ocr_version TEXT")
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS ocr_words (
+            image_id INTEGER NOT NULL REFERENCES images (id),
+            word_num INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            conf REAL,
+            left INTEGER,
+            top INTEGER,
+            width INTEGER,
+            height INTEGER,
+            PRIMARY KEY (image_id, word_num)
+        );
+        CREATE INDEX IF NOT EXISTS idx_ocr_words_word ON ocr_words (word COLLATE NOCASE, conf);
+
+        CREATE TRIGGER IF NOT EXISTS ocr_words_delete AFTER DELETE ON images BEGIN
+            DELETE FROM ocr_words WHERE image_id = old.id;
+        END;
+    """)
+
+
+def parse_year(date):
+    """'1960' -> 1960; missing or non-numeric dates -> None."""
+    try:
+        return int(date)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_diameter(dimension):
+    """
+    '4.5cm' -> 4.5, None for anything that isn't a "cm" dimension. Matches the SQL the
+    backend used to sort with: CAST(REPLACE(dimension, 'cm', '') AS REAL), which reads
+    the leading number and ignores the rest ('abccm' -> 0.0).
+    """
+    if dimension is None or not dimension.lower().endswith("cm"):
+        return None
+    number = re.match(r"\s*[-+]?(\d+\.?\d*|\.\d+)", dimension.replace("cm", ""))
+    return float(number.group()) if number else 0.0
+
+
+def collection_id(cursor, name):
+    """Id of a collection (the `type` string) in the lookup table, added on first use."""
+    if name is None:
+        return None
+    cursor.execute("INSERT OR IGNORE INTO collections (name) VALUES (?)", (name,))
+    cursor.execute("SELECT id FROM collections WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
+
+
+def typed_columns(cursor, date, dimension, type):
+    """year / diameter_cm / collection_id for a row with these TEXT values."""
+    return {
+        "year": parse_year(date),
+        "diameter_cm": parse_diameter(dimension),
+        "collection_id": collection_id(cursor, type),
+    }
+
+
+def fill_typed_columns(conn):
+    """Recompute the typed columns of every row from date / dimension / type."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, date, dimension, type FROM images")
+    updates = [
+        {**typed_columns(cursor, date, dimension, type), "id": image_id}
+        for image_id, date, dimension, type in cursor.fetchall()
+    ]
+    cursor.executemany(
+        "UPDATE images SET year = :year, diameter_cm = :diameter_cm, collection_id = :collection_id WHERE id = :id",
+        updates,
+    )
+    return len(updates)
+
+
+def add_typed_columns(conn):
+    """
+    Typed copies of the TEXT fields: year INTEGER (from date), diameter_cm REAL
+    (from '4.5cm' dimensions) and collection_id pointing into a lookup table of types.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS collections (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    existing = column_names(cursor, "images")
+    for column, sql_type in (("year", "INTEGER"), ("diameter_cm", "REAL"),
+                             ("collection_id", "INTEGER REFERENCES collections (id)")):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE images ADD COLUMN {column} {sql_type}")
+    print(f"✅ Filled year/diameter_cm/collection_id for {fill_typed_columns(conn)} images")
+
+
+def add_filter_indexes(conn):
+    """
+    Indexes in the /images sort order, (diameter, id) with missing diameters last, so
+    results are read in order instead of sorted in a temp B-tree. A type filter is an
+    equality prefix of the second one. The expression must match DIMENSION_SORT in
+    backend/queries.py exactly for SQLite to use them.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_sort ON images (COALESCE(diameter_cm, 999999), id)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_images_collection_sort ON images (collection_id, COALESCE(diameter_cm, 999999), id)"
+    )
+    cursor.execute("ANALYZE")
+
+
+def add_natural_key_indexes(conn):
+    """
+    The archive filename is an image's natural key: make it unique so merge_db.py can
+    upsert on it, and index content_hash to spot the same image under another name.
+    Rows that repeat a filename (the same button ingested twice) keep the oldest id; every
+    removed id is printed with the id it duplicated.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT images.id, images.filename, kept.id
+        FROM images
+        JOIN (SELECT MIN(id) AS id, filename FROM images WHERE filename IS NOT NULL GROUP BY filename) AS kept
+          ON kept.filename = images.filename AND kept.id != images.id
+        ORDER BY images.id
+    """)
+    duplicates = cursor.fetchall()
+    for image_id, filename, kept_id in duplicates:
+        print(f"♻️ Removing row {image_id} ({filename}): duplicate of row {kept_id}")
+    cursor.executemany("DELETE FROM images WHERE id = ?", [(image_id,) for image_id, _, _ in duplicates])
+    if duplicates:
+        print(f"✅ Removed {len(duplicates)} duplicate rows")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_images_filename ON images (filename)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_content_hash ON images (content_hash)")
+
+
+def add_lab_colors(conn):
+    """
+    CIELAB copy of `color` (lab_l, lab_a, lab_b) for ΔE color search, and a palettes table
+    with the main k-means clusters of each image (filled by load_images.py / build_palettes.py).
+    """
+    cursor = conn.cursor()
+    existing = column_names(cursor, "images")
+    for column in ("lab_l", "lab_a", "lab_b"):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE images ADD COLUMN {column} REAL")
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS palettes (
+            image_id INTEGER NOT NULL REFERENCES images (id),
+            rank INTEGER NOT NULL,
+            color TEXT NOT NULL,
+            weight REAL NOT NULL,
+            lab_l REAL NOT NULL,
+            lab_a REAL NOT NULL,
+            lab_b REAL NOT NULL,
+            PRIMARY KEY (image_id, rank)
+        );
+
+        CREATE TRIGGER IF NOT EXISTS palettes_delete AFTER DELETE ON images BEGIN
+            DELETE FROM palettes WHERE image_id = old.id;
+        END;
+    """)
+
+    cursor.execute("SELECT id, color FROM images WHERE color IS NOT NULL AND lab_l IS NULL")
+    updates = [(*(hex_to_lab(color) or (None, None, None)), image_id) for image_id, color in cursor.fetchall()]
+    cursor.executemany("UPDATE images SET lab_l = ?, lab_a = ?, lab_b = ? WHERE id = ?", updates)
+    print(f"✅ Filled lab_l/lab_a/lab_b for {len(updates)} images")
+
+
+def add_perceptual_hashes(conn):
+    """
+    64-bit average / difference / DCT hashes of each image as 16 hex digits, for near-duplicate
+    search (filled by load_images.py / build_hashes.py, they need the image files).
+    """
+    cursor = conn.cursor()
+    existing = column_names(cursor, "images")
+    for column in ("ahash", "dhash", "phash"):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE images ADD COLUMN {column} TEXT")
+
+
+# Facet buckets of an images row (NEW/OLD in the triggers below); -1 stands for "unknown"
+# so every row lands in a bucket. Must stay identical to FACET_BUCKETS in backend/queries.py.
+FACET_BUCKET_SQL = {
+    "year": "COALESCE({row}.year, -1)",
+    "collection_id": "COALESCE({row}.collection_id, -1)",
+    "diameter_bucket": "COALESCE(CAST({row}.diameter_cm AS INTEGER), -1)",
+    "hue_bucket": "COALESCE(MIN(CAST({row}.hue / 30 AS INTEGER), 11), -1)",
+}
+
+
+def add_facet_counts(conn):
+    """
+    Row counts per (year, collection, 1 cm diameter bucket, 30° hue bucket), kept up to date
+    by triggers, so /facets sums a few hundred cells instead of scanning every image.
+    """
+    columns = ", ".join(FACET_BUCKET_SQL)
+
+    def buckets(row):
+        return ", ".join(sql.format(row=row) for sql in FACET_BUCKET_SQL.values())
+
+    def matches(row):
+        return " AND ".join(f"{column} = {sql.format(row=row)}" for column, sql in FACET_BUCKET_SQL.items())
+
+    add_sql = f"""
+        INSERT INTO facet_counts ({columns}, count) VALUES ({buckets("new")}, 1)
+        ON CONFLICT ({columns}) DO UPDATE SET count = count + 1;
+    """
+    remove_sql = f"""
+        UPDATE facet_counts SET count = count - 1 WHERE {matches("old")};
+        DELETE FROM facet_counts WHERE count = 0 AND {matches("old")};
+    """
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS facet_counts (
+            year INTEGER NOT NULL,
+            collection_id INTEGER NOT NULL,
+            diameter_bucket INTEGER NOT NULL,
+            hue_bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY ({columns})
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS facet_counts_insert AFTER INSERT ON images BEGIN
+            {add_sql}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS facet_counts_delete AFTER DELETE ON images BEGIN
+            {remove_sql}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS facet_counts_update AFTER UPDATE OF year, collection_id, diameter_cm, hue ON images BEGIN
+            {remove_sql}
+            {add_sql}
+        END;
+    """)
+    conn.execute("DELETE FROM facet_counts")
+    conn.execute(f"INSERT INTO facet_counts SELECT {buckets('images')}, COUNT(*) FROM images GROUP BY 1, 2, 3, 4")
+    cells = conn.execute("SELECT COUNT(*) FROM facet_counts").fetchone()[0]
+    print(f"✅ Facet counts filled ({cells} cells)")
+
+
+# Applied in order; PRAGMA user_version records how many a database already has.
+# Append new migrations at the end, never reorder or remove them.
+MIGRATIONS = [
+    add_hsl_columns,
+    add_filename_column,
+    add_content_hash_column,
+    add_fts_index,
+    add_ocr_words,
+    add_typed_columns,
+    add_filter_indexes,
+    add_natural_key_indexes,
+    add_lab_colors,
+    add_perceptual_hashes,
+    add_facet_counts,
+]
+
+
+def migrate(conn):
+    """Bring a database up to the latest schema, running only the migrations it hasn't had yet."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return len(MIGRATIONS)
+
+
+if __name__ == "__main__":
+    # Database to upgrade in place (pass a different path as the first argument)
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "images2.db"
+    conn = sqlite3.connect(db_path)
+    version = migrate(conn)
+    conn.close()
+    print(f"✅ {db_path} is up to date (schema version {version})!")
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import tempfile
+import cv2
+
+# Tesseract binary (same default pytesseract uses)
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", "tesseract")
+
+# Extra command-line options for tesseract, e.g. ["--psm", "11"]
+TESSERACT_ARGS = []
+
+# Where preprocessed inputs are kept, keyed by content hash (relative to the backend folder)
+OCR_CACHE = "cache/ocr/"
+
+# Images handed to one tesseract process
+OCR_BATCH_SIZE = 32
+
+# "gray" is what load_images.py always fed tesseract; "otsu" binarizes it first
+PREPROCESS_MODES = ("gray", "otsu")
+DEFAULT_PREPROCESS = "gray"
+
+_engine_version = None
+
+
+def engine_version():
+    """First line of `tesseract --version`, e.g. "tesseract 5.3.0"."""
+    global _engine_version
+    if _engine_version is None:
+        output = subprocess.run([TESSERACT_CMD, "--version"], capture_output=True, text=True, check=True)
+        # Older builds print the version on stderr
+        _engine_version = (output.stdout or output.stderr).splitlines()[0].strip()
+    return _engine_version
+
+
+def ocr_version(preprocess=DEFAULT_PREPROCESS):
+    """
+    Stored in images.ocr_version. Anything that changes the OCR output is part of it,
+    so rows whose version differs from the current one are the ones worth re-OCRing.
+    """
+    return "|".join([engine_version(), preprocess, " ".join(TESSERACT_ARGS)])
+
+
+def preprocess_image(img, mode=DEFAULT_PREPROCESS):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if mode == "otsu":
+        _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return gray
+
+
+def cached_input(img, content_hash, mode=DEFAULT_PREPROCESS, cache_folder=OCR_CACHE):
+    """
+    Path of the preprocessed (grayscale / binarized) PNG for an image, written on first use.
+    `img` may be None when the caller expects a cache hit; it's only decoded if needed.
+    """
+    path = os.path.join(cache_folder, content_hash[:2], f"{content_hash}_{mode}.png")
+    if not os.path.exists(path):
+        if img is None:
+            raise FileNotFoundError(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.png"
+        cv2.imwrite(tmp_path, preprocess_image(img, mode))
+        os.replace(tmp_path, path)
+    return path
+
+
+def parse_tsv(tsv, count):
+    """
+    Split tesseract's TSV output for a batch into one result per input image.
+    Each result is {"text": str, "words": [(word_num, word, conf, left, top, width, height)]};
+    text keeps tesseract's line breaks, with a blank line between blocks.
+    """
+    results = [{"lines": {}, "words": []} for _ in range(count)]
+    for line in tsv.splitlines()[1:]:
+        fields = line.split("\t")
+        if len(fields) < 12 or fields[0] != "5":  # level 5 = word
+            continue
+        page, block, par, line_num = (int(f) for f in fields[1:5])
+        left, top, width, height = (int(f) for f in fields[6:10])
+        word = fields[11].strip()
+        if not word or not 1 <= page <= count:
+            continue
+        result = results[page - 1]
+        result["words"].append((len(result["words"]) + 1, word, float(fields[10]), left, top, width, height))
+        result["lines"].setdefault((block, par, line_num), []).append(word)
+
+    for result in results:
+        text, previous_block = [], None
+        for (block, _, _), words in result.pop("lines").items():
+            if previous_block is not None and block != previous_block:
+                text.append("")
+            text.append(" ".join(words))
+            previous_block = block
+        result["text"] = "\n".join(text)
+    return results
+
+
+def ocr_batch(paths):
+    """
+    OCR many images with a single tesseract process: tesseract reads a list file and
+    treats each image as a page, so the process start-up cost is paid once per batch.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as list_file:
+        list_file.write("\n".join(os.path.abspath(p) for p in paths) + "\n")
+    try:
+        output = subprocess.run(
+            [TESSERACT_CMD, list_file.name, "stdout", *TESSERACT_ARGS, "tsv"],
+            capture_output=True, text=True, check=True,
+        )
+    finally:
+        os.remove(list_file.name)
+    return parse_tsv(output.stdout, len(paths))
@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+
+# 64-bit hashes, stored in images.ahash / dhash / phash as 16 hex digits
+HASH_SIZE = 8
+
+
+def to_hex(bits):
+    """Pack a boolean array (row-major, 64 values) into a 16-digit hex string."""
+    return f"{int(''.join('1' if b else '0' for b in bits.flatten()), 2):016x}"
+
+
+def grayscale(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def ahash(img):
+    """Average hash: which pixels of an 8x8 thumbnail are brighter than its mean."""
+    small = cv2.resize(grayscale(img), (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return to_hex(small > small.mean())
+
+
+def dhash(img):
+    """Difference hash: whether each pixel of a 9x8 thumbnail is brighter than its left neighbour."""
+    small = cv2.resize(grayscale(img), (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return to_hex(small[:, 1:] > small[:, :-1])
+
+
+def phash(img):
+    """
+    DCT hash: the 8x8 lowest frequencies of a 32x32 thumbnail compared with their median
+    (the DC term is left out of the median). Survives rescaling, recompression and small
+    color shifts better than the other two.
+    """
+    small = cv2.resize(grayscale(img), (HASH_SIZE * 4, HASH_SIZE * 4), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:HASH_SIZE, :HASH_SIZE]
+    return to_hex(low > np.median(low.flatten()[1:]))
+
+
+def image_hashes(img):
+    """{"ahash", "dhash", "phash"} of a decoded (BGR) image."""
+    return {"ahash": ahash(img), "dhash": dhash(img), "phash": phash(img)}
@@ -1,11 +1,60 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import FileResponse
-import sqlite3
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+import mimetypes
 import os
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from archive_index import ArchiveIndex
+from atlas import AtlasCache, atlas_capacity
+from catalog import CatalogSnapshot
+from color_index import ColorIndex
+from colors import hex_to_hsl, hex_to_lab
+from db import DB_PATH, ConnectionPool, db_stamp
+from fast_json import dumps
+from hash_index import HASH_KINDS, HashIndex
+from http_cache import IMMUTABLE_CACHE_CONTROL, byte_range, cache_headers, is_not_modified
+from image_pack import ImagePack
+from queries import FACET_BUCKETS, IMAGE_COLUMNS, ImageQuery, decode_cursor, encode_cursor, facet_query, select_by_ids
+from renditions import RENDITION_FORMATS, RENDITION_WIDTHS, RenditionCache, nearest_width
+from result_cache import ResultCache
+from suggestions import SuggestionIndex
+from tracing import PROFILING, ROWS_READ, ROWS_RETURNED, TracingMiddleware, render_metrics, span
 
+# Set the correct folder where images are stored
+IMAGE_FOLDER = os.path.abspath("archive/")  # Change "images/" to "archive/"
+
+# Filenames in the archive, scanned once at startup and re-scanned when the folder changes
+archive = ArchiveIndex(IMAGE_FOLDER)
+ARCHIVE_POLL_SECONDS = float(os.environ.get("ARCHIVE_POLL_SECONDS", "5"))
+
+# Resized copies of archive images (built by 2_SQL/build_renditions.py or on first request)
+RENDITION_FOLDER = os.path.abspath("cache/renditions/")
+renditions = RenditionCache(archive, RENDITION_FOLDER)
+
+# Sprite sheets of renditions for a page of results (see /images/atlas), keyed on the page's
+# ids and a change marker for images2.db and the archive; ATLAS_CACHE_MB caps the folder
+ATLAS_FOLDER = os.path.abspath("cache/atlases/")
+atlases = AtlasCache(
+    renditions,
+    ATLAS_FOLDER,
+    lambda: (db_stamp(DB_PATH), archive.folder_mtime),
+    max_bytes=int(float(os.environ.get("ATLAS_CACHE_MB", "512")) * (1 << 20)),
+)
+
+# Read-only SQLite connections shared by all requests (DB_POOL_SIZE connections at most)
+db_pool = ConnectionPool(DB_PATH, size=int(os.environ.get("DB_POOL_SIZE", "8")))
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db_pool.open()
+    archive.refresh()
+    if ARCHIVE_POLL_SECONDS > 0:
+        archive.start_polling(ARCHIVE_POLL_SECONDS)
+    yield
+    archive.stop_polling()
+    db_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,56 +62,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],  # Lets the gallery read the pagination cursor and timings
 )
 
-# Set the correct folder where images are stored
-IMAGE_FOLDER = os.path.abspath("archive/")  # Change "images/" to "archive/"
+# Request latency, bytes sent and per-phase spans for /metrics. With PROFILING=1 any request
+# can also add ?profile=1 to get a flamegraph-ready stack dump instead of its response.
+app.add_middleware(TracingMiddleware)
 
-def get_db_connection():
-    conn = sqlite3.connect("images2.db")
-    conn.row_factory = sqlite3.Row  # Allows dict-like row access
-    return conn
+# Opt-in: serve /images from an in-memory columnar copy of the table (set CATALOG_SNAPSHOT=1).
+# The copy is reloaded automatically when images2.db changes.
+catalog = CatalogSnapshot(DB_PATH) if os.environ.get("CATALOG_SNAPSHOT") == "1" else None
 
-def hex_to_hsl(hex_str: str):
-    """
-    Convert a hex color string (e.g. "#ff0000") to an HSL tuple.
-    Returns a tuple (h, s, l) where:
-      - h is the hue in degrees (0 to 360)
-      - s and l are in the range [0, 1]
-    """
-    hex_str = hex_str.lstrip('#')
-    if len(hex_str) != 6:
-        # Return a default value if invalid format
-        return (0, 0, 0)
-    r = int(hex_str[0:2], 16) / 255.0
-    g = int(hex_str[2:4], 16) / 255.0
-    b = int(hex_str[4:6], 16) / 255.0
-
-    max_val = max(r, g, b)
-    min_val = min(r, g, b)
-    l = (max_val + min_val) / 2
-
-    if max_val == min_val:
-        h = 0
-        s = 0
-    else:
-        d = max_val - min_val
-        s = d / (2 - max_val - min_val) if l > 0.5 else d / (max_val + min_val)
-        if max_val == r:
-            h = (g - b) / d + (6 if g < b else 0)
-        elif max_val == g:
-            h = (b - r) / d + 2
-        else:  # max_val == b
-            h = (r - g) / d + 4
-        h /= 6
-    # Convert hue to degrees (0-360)
-    return (h * 360, s, l)
+# Opt-in: serve original images out of one memory-mapped pack file built by
+# 2_SQL/build_pack.py (set PACKED_STORE=1). Files missing from the pack come from archive/.
+pack = ImagePack(os.path.abspath(os.environ.get("PACK_PATH", "archive.pack"))) if os.environ.get("PACKED_STORE") == "1" else None
 
-##############################################################################################################################
-##############################################################################################################################
+# Sorted prefix index for /suggestions, rebuilt when images2.db changes
+suggestion_index = SuggestionIndex(DB_PATH)
 
-@app.get("/images")
-def get_images(
+# Lab colors and palettes in a grid for /images/similar-color, rebuilt when images2.db changes
+color_index = ColorIndex(DB_PATH)
+
+# Perceptual hash lookup tables for /images/{id}/similar, rebuilt when images2.db changes
+hash_index = HashIndex(DB_PATH)
+
+# Serialized /images, /images/count, /facets and /suggestions responses, dropped whenever images2.db
+# or the archive folder changes. RESULT_CACHE_MB=0 turns it off; entries are also shared
+# with other uvicorn workers through cache/results/ (RESULT_CACHE_DISK_MB, 0 = memory only)
+result_cache = ResultCache(
+    lambda: (db_stamp(DB_PATH), archive.folder_mtime),
+    max_bytes=int(float(os.environ.get("RESULT_CACHE_MB", "64")) * (1 << 20)),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", "300")),
+    folder=os.path.abspath("cache/results/"),
+    max_disk_bytes=int(float(os.environ.get("RESULT_CACHE_DISK_MB", "256")) * (1 << 20)),
+)
+
+# Rows fetched from SQLite (and encoded) per chunk when /images streams its response
+STREAM_BATCH_SIZE = 500
+
+# Fields /images can return; pick a subset with ?fields=id,title,image_url
+IMAGE_FIELDS = ("id", "title", "date", "type", "dimension", "color", "image_url", "ocr_text")
+
+# Database columns needed to produce each field
+FIELD_COLUMNS = {
+    "id": ("id",),
+    "title": ("title",),
+    "date": ("date",),
+    "type": ("type",),
+    "dimension": ("dimension",),
+    "color": ("color",),
+    "image_url": ("filename", "title", "date", "type", "dimension"),
+    "ocr_text": ("ocr_text",),
+}
+
+def image_filters(
     min_date: int = Query(None, description="Minimum date (e.g., 1940)"),
     max_date: int = Query(None, description="Maximum date (e.g., 2000)"),
     apply_date: bool = Query(True, description="Whether to apply the date filter"),
@@ -72,122 +125,465 @@ def get_images(
     ),
     color: str = Query(None, description="Selected color in hex (e.g., #ff0000) for hue filtering"),
     hue_tolerance: float = Query(10.0, description="Hue tolerance in degrees"),
-    keyword: str = Query(None, description="Search keyword for OCR text")
+    keyword: str = Query(None, description="Search keyword for OCR text"),
+    keyword_mode: str = Query(
+        "like",
+        description="'like' matches the keyword anywhere in the title; 'fts' runs a ranked full-text search over title and OCR text"
+    ),
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Construct query dynamically
-    query = "SELECT * FROM images WHERE 1=1"
-    params = []
-
-    # Date range filtering: only apply if apply_date is True
-    if apply_date:
-        if min_date and max_date:
-            query += " AND date BETWEEN ? AND ?"
-            params.extend([min_date, max_date])
-        elif min_date:
-            query += " AND date >= ?"
-            params.append(min_date)
-        elif max_date:
-            query += " AND date <= ?"
-            params.append(max_date)
-
-    # Type filtering
-    if type:
-        if type == "political-campaigns":
-            query += " AND type = ?"
-            params.append("political-campaigns")
-        elif type == "other":
-            query += " AND type != ?"
-            params.append("political-campaigns")
-        else:
-            query += " AND type = ?"
-            params.append(type)
-
-    # Keyword filtering (search in OCR text)
-    if keyword:
-        query += " AND title LIKE ?"
-        params.append(f"%{keyword}%")
-
-    # Append an ORDER BY clause to sort by the numeric dimension (small to big).
-    # This removes the "cm" suffix and casts the remainder as a REAL.
-    # Images without a valid "cm" dimension (e.g., "na") are sorted as if they had a very large value.
-    query += """
-        ORDER BY 
-        CASE 
-            WHEN dimension LIKE '%cm' THEN CAST(REPLACE(dimension, 'cm', '') AS REAL)
-            ELSE 999999
-        END ASC
-    """
+    """Filter parameters shared by /images, /images/count and /facets."""
+    # Normalize the color so it always starts with a single "#" and work out its hue
+    selected_hue = None
+    if color:
+        color = "#" + color.lstrip("#")
+        try:
+            selected_hue, _, _ = hex_to_hsl(color)
+        except Exception as e:
+            print("Error converting selected color:", e)
+
+    return {
+        "min_date": min_date,
+        "max_date": max_date,
+        "apply_date": apply_date,
+        "type": type,
+        "selected_hue": selected_hue,
+        "hue_tolerance": hue_tolerance,
+        "keyword": keyword,
+        "keyword_mode": keyword_mode,
+    }
+
+def use_catalog(filters):
+    # The snapshot has no full-text index, so ranked keyword searches always go to SQLite
+    return catalog is not None and not (filters["keyword"] and filters["keyword_mode"] == "fts")
+
+def filters_key(filters):
+    """The filters as a hashable cache key, with values that can't change the result dropped."""
+    normalized = dict(filters)
+    if not normalized["apply_date"]:
+        normalized["min_date"] = normalized["max_date"] = None
+    if normalized["selected_hue"] is None:
+        normalized["hue_tolerance"] = None
+    if not normalized["keyword"]:
+        normalized["keyword"] = normalized["keyword_mode"] = None
+    return tuple(sorted(normalized.items()))
+
+def cached_response(key, compute, media_type="application/json"):
+    """Serve compute() -> (body bytes, headers) through the result cache."""
+    body, headers, hit = result_cache.get_or_compute(key, compute)
+    return Response(body, media_type=media_type, headers={**headers, "X-Cache": "HIT" if hit else "MISS"})
+
+def snapshot_filters(filters):
+    return {k: v for k, v in filters.items() if k != "keyword_mode"}
+
+def parse_fields(fields: str):
+    if not fields:
+        return IMAGE_FIELDS
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in IMAGE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(f for f in IMAGE_FIELDS if f in wanted)
+
+def field_columns(fields):
+    """Database columns to select for the requested fields (always including id), in table order."""
+    return sorted({"id", *(c for f in fields for c in FIELD_COLUMNS[f])}, key=IMAGE_COLUMNS.index)
 
-    cursor.execute(query, params)
-    images = cursor.fetchall()
-    conn.close()
+def rows_by_id(ids, fields):
+    """{id: row} for the given image ids, with the columns needed for `fields`."""
+    with db_pool.connection() as conn:
+        with span("query"):
+            rows = conn.execute(select_by_ids(field_columns(fields), len(ids)), list(ids)).fetchall()
+    return {row["id"]: row for row in rows}
 
-    # Construct image list
-    image_list = []
-    for img in images:
+def row_filename(img):
+    """Archive filename of an images row."""
+    filename = img["filename"] if "filename" in img.keys() else None
+    if not filename:
+        # Rows that predate the filename column: rebuild the name from the metadata
         title_val = img["title"] if img["title"] is not None else "na"
         date_val = img["date"] if img["date"] is not None else "na"
         type_val = img["type"] if img["type"] is not None else "na"
         dimension_val = img["dimension"] if img["dimension"] is not None else "na"
         filename = f"{title_val}_{date_val}_{type_val}_{dimension_val}.jpg".replace(" ", "-")
-        image_path = os.path.join(IMAGE_FOLDER, filename)
+    return filename
 
-        if os.path.exists(image_path):
-            image_url = f"http://127.0.0.1:8000/image/{filename}"
+def image_from_row(img, fields=IMAGE_FIELDS):
+    """Turn an images row (sqlite3.Row or dict) into the JSON object served by /images."""
+    image = {}
+    for field in fields:
+        if field == "dimension":
+            image["dimension"] = img["dimension"] if img["dimension"] is not None else "na"
+        elif field == "image_url":
+            filename = row_filename(img)
+            image["image_url"] = f"http://127.0.0.1:8000/image/{filename}" if filename in archive else None
         else:
-            image_url = None
+            image[field] = img[field]
+    return image
 
-        image_list.append({
-            "id": img["id"],
-            "title": img["title"],
-            "date": img["date"],
-            "type": img["type"],
-            "dimension": dimension_val,
-            "color": img["color"],
-            "image_url": image_url,
-            "ocr_text": img["ocr_text"]  # <-- Added OCR text here!
-        })
+def image_batches(filters, fields, after=None, limit=None):
+    """
+    Yield the matching rows in order, STREAM_BATCH_SIZE at a time. On the SQL path the
+    pooled connection is held only while the generator is being consumed.
+    """
+    if use_catalog(filters):
+        with span("query"):
+            snapshot = catalog.current()
+            images = snapshot.query(after=after, limit=limit, **snapshot_filters(filters))
+        ROWS_READ.inc(len(snapshot.rows), endpoint="images", source="catalog")
+        for start in range(0, len(images), STREAM_BATCH_SIZE):
+            yield images[start:start + STREAM_BATCH_SIZE]
+        return
 
+    query, params = ImageQuery(**filters).select(field_columns(fields), after=after, limit=limit)
+    with db_pool.connection() as conn:
+        with span("query"):
+            rows = conn.execute(query, params)
+        while True:
+            with span("fetch"):
+                batch = rows.fetchmany(STREAM_BATCH_SIZE)
+            if not batch:
+                break
+            ROWS_READ.inc(len(batch), endpoint="images", source="sqlite")
+            yield batch
 
-    # Hue filtering: if a color is provided, filter images by comparing hue difference.
-    if color:
-        # Normalize the color so it always starts with a single "#"
-        color = "#" + color.lstrip("#")
-        try:
-            selected_hue, _, _ = hex_to_hsl(color)
-        except Exception as e:
-            print("Error converting selected color:", e)
-            selected_hue = None
-
-        if selected_hue is not None:
-            filtered_list = []
-            for img in image_list:
-                img_color = img.get("color")
-                if img_color:
-                    image_hue, _, _ = hex_to_hsl(img_color)
-                    hue_diff = abs(selected_hue - image_hue)
-                    if hue_diff > 180:
-                        hue_diff = 360 - hue_diff
-                    print(f"Image ID {img['id']}: image_hue={image_hue:.2f}, selected_hue={selected_hue:.2f}, hue_diff={hue_diff:.2f}")
-                    if hue_diff <= hue_tolerance:
-                        filtered_list.append(img)
-            image_list = filtered_list
-
-    return image_list
+def image_page(filters, fields, after=None, limit=None):
+    """One page of matching rows, plus the X-Next-Cursor header when more rows follow."""
+    # Fetch one extra row to know whether there is a next page
+    images = [row for batch in image_batches(filters, fields, after, limit + 1 if limit else None) for row in batch]
+    headers = {}
+    if limit and len(images) > limit:
+        images = images[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(images[-1]["sort_key"], images[-1]["id"])
+    ROWS_RETURNED.inc(len(images), endpoint="images")
+    return images, headers
+
+def ndjson_chunks(batches, fields):
+    for batch in batches:
+        ROWS_RETURNED.inc(len(batch), endpoint="images")
+        with span("json_encode"):
+            chunk = b"".join(dumps(image_from_row(img, fields)) + b"\n" for img in batch)
+        yield chunk
+
+def json_array_chunks(batches, fields):
+    yield b"["
+    first = True
+    for batch in batches:
+        ROWS_RETURNED.inc(len(batch), endpoint="images")
+        with span("json_encode"):
+            chunk = b",".join(dumps(image_from_row(img, fields)) for img in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
 
 ##############################################################################################################################
 ##############################################################################################################################
 
+@app.get("/images")
+def get_images(
+    filters: dict = Depends(image_filters),
+    limit: int = Query(None, ge=1, le=1000, description="Page size; the next page's cursor is sent in the X-Next-Cursor header"),
+    cursor: str = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. id,title,image_url (default: all)"),
+    format: str = Query(
+        "json",
+        description="'json' for one array (default); 'ndjson' or 'json-stream' stream rows as they are read, "
+                    "one object per line or as a chunked array (no X-Next-Cursor in streaming modes)"
+    ),
+):
+    fields = parse_fields(fields)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if format not in ("json", "ndjson", "json-stream"):
+        raise HTTPException(status_code=400, detail="format must be 'json', 'ndjson' or 'json-stream'")
+
+    if format != "json":
+        batches = image_batches(filters, fields, after, limit)
+        if format == "ndjson":
+            return StreamingResponse(ndjson_chunks(batches, fields), media_type="application/x-ndjson")
+        return StreamingResponse(json_array_chunks(batches, fields), media_type="application/json")
+
+    def compute():
+        images, headers = image_page(filters, fields, after, limit)
+        with span("row_build"):
+            images = [image_from_row(img, fields) for img in images]
+        with span("json_encode"):
+            return dumps(images), headers
+
+    return cached_response(("images", filters_key(filters), limit, cursor, fields), compute)
+
+@app.get("/images/atlas")
+def get_image_atlas(
+    filters: dict = Depends(image_filters),
+    w: int = Query(128, gt=0, description="Tile width in px; rounded up to the closest rendition width"),
+    limit: int = Query(100, ge=1, le=1000, description="Tiles per atlas (fewer for wide tiles); continue with X-Next-Cursor"),
+    cursor: str = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: str = Query(None, description="Comma-separated fields to return, as for /images"),
+    format: str = Query("webp", description="Atlas format: 'webp' or 'jpeg'"),
+):
+    """
+    A page of /images results packed into one sprite sheet: the JSON lists the images with
+    their {x, y, w, h} cell in the atlas ("atlas": null for images missing from the archive).
+    """
+    fields = parse_fields(fields)
+    width = nearest_width(w)
+    if width is None:
+        raise HTTPException(status_code=400, detail=f"w must be at most {RENDITION_WIDTHS[-1]}")
+    if format not in RENDITION_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'webp' or 'jpeg'")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # image_url is always fetched: the rows' filenames decide what goes in the atlas
+    images, headers = image_page(filters, tuple({*fields, "image_url"}), after, min(limit, atlas_capacity(width)))
+    filenames = [row_filename(img) for img in images]
+    in_archive = [(img["id"], filename) for img, filename in zip(images, filenames) if filename in archive]
+
+    body = {"atlas_url": None, "width": 0, "height": 0, "tile_width": width, "images": []}
+    tiles = {}
+    if in_archive:
+        ids, in_archive = zip(*in_archive)
+        key, atlas_map = atlases.get(ids, in_archive, width, format)
+        tiles = dict(zip(in_archive, atlas_map["tiles"]))
+        body.update(
+            atlas_url=f"http://127.0.0.1:8000/atlas/{key}{RENDITION_FORMATS[format][0]}",
+            width=atlas_map["width"],
+            height=atlas_map["height"],
+        )
+    body["images"] = [
+        {**image_from_row(img, fields), "atlas": tiles.get(filename)} for img, filename in zip(images, filenames)
+    ]
+    return Response(dumps(body), media_type="application/json", headers=headers)
+
+@app.get("/images/similar-color")
+def get_similar_color(
+    color: str = Query(..., description="Hex color to match, e.g. #c0392b"),
+    k: int = Query(20, ge=1, le=200, description="Number of images to return"),
+    match: str = Query("palette", description="'palette' compares with each image's main colors; 'dominant' only with its color"),
+    max_distance: float = Query(None, gt=0, description="Only images within this ΔE (CIE76) of the color"),
+    fields: str = Query(None, description="Comma-separated fields to return, as for /images"),
+):
+    """
+    The k images closest to a color in CIELAB space, closest first, each with its "delta_e".
+    Unlike the hue filter of /images this takes lightness and saturation into account, so
+    a near-white color only matches near-white buttons.
+    """
+    fields = parse_fields(fields)
+    lab = hex_to_lab(color)
+    if lab is None:
+        raise HTTPException(status_code=400, detail="color must be a hex color like #c0392b")
+    with span("color_search"):
+        nearest = color_index.nearest(lab, k, "dominant" if match == "dominant" else "palette", max_distance)
+    rows = rows_by_id([image_id for image_id, _ in nearest], fields) if nearest else {}
+    with span("row_build"):
+        images = [
+            {**image_from_row(rows[image_id], fields), "delta_e": round(distance, 2)}
+            for image_id, distance in nearest if image_id in rows
+        ]
+    ROWS_RETURNED.inc(len(images), endpoint="similar-color")
+    with span("json_encode"):
+        return Response(dumps(images), media_type="application/json")
+
+@app.get("/images/{image_id}/similar")
+def get_similar_images(
+    image_id: int,
+    hash: str = Query("phash", description="Perceptual hash to compare: 'phash' (default), 'dhash' or 'ahash'"),
+    max_distance: int = Query(10, ge=0, le=16, description="Maximum Hamming distance between hashes (out of 64 bits)"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of images"),
+    fields: str = Query(None, description="Comma-separated fields to return, as for /images"),
+):
+    """
+    Images that look like this one (same button photographed again, re-scraped or resized),
+    closest first, each with its hash "distance". About 6 bits or less is usually the same button.
+    """
+    fields = parse_fields(fields)
+    if hash not in HASH_KINDS:
+        raise HTTPException(status_code=400, detail="hash must be 'phash', 'dhash' or 'ahash'")
+    with span("hash_search"):
+        matches = hash_index.similar(image_id, hash, max_distance, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Image not found or not hashed yet")
+
+    rows = rows_by_id([other for other, _ in matches], fields) if matches else {}
+    with span("row_build"):
+        images = [
+            {**image_from_row(rows[other], fields), "distance": distance}
+            for other, distance in matches if other in rows
+        ]
+    ROWS_RETURNED.inc(len(images), endpoint="similar")
+    with span("json_encode"):
+        return Response(dumps(images), media_type="application/json")
+
+@app.get("/atlas/{name}")
+def get_atlas(name: str, request: Request):
+    """Atlas image named by /images/atlas; the name is a content hash, so it never changes."""
+    key, ext = os.path.splitext(name)
+    fmt = next((f for f, (e, _, _) in RENDITION_FORMATS.items() if e == ext), None)
+    if fmt is None or len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+        raise HTTPException(status_code=404, detail="Atlas not found")
+    path = atlases.atlas_path(key, fmt)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Atlas not found")
+
+    mtime_ns = os.stat(path).st_mtime_ns
+    headers = cache_headers(f'"{key}"', mtime_ns, IMMUTABLE_CACHE_CONTROL)
+    if is_not_modified(request.headers, headers["ETag"], mtime_ns):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=RENDITION_FORMATS[fmt][1], headers=headers)
+
+@app.get("/images/count")
+def count_images(filters: dict = Depends(image_filters)):
+    """Number of images matching the /images filters, without fetching them."""
+    def compute():
+        if use_catalog(filters):
+            return dumps({"count": catalog.count(**snapshot_filters(filters))}), {}
+        query, params = ImageQuery(**filters).count()
+        with db_pool.connection() as conn:
+            return dumps({"count": conn.execute(query, params).fetchone()[0]}), {}
+
+    return cached_response(("count", filters_key(filters)), compute)
+
+@app.get("/facets")
+def get_facets(
+    filters: dict = Depends(image_filters),
+    year_bucket: str = Query("year", description="'year' counts each year; 'decade' groups them by decade"),
+):
+    """
+    Image counts per year (or decade), type, diameter (whole cm) and hue (30° sectors) for
+    the date slider and filter chips. Each facet applies every filter except its own.
+    """
+    def compute():
+        facets = {}
+        with span("query"), db_pool.connection() as conn:
+            names = dict(conn.execute("SELECT id, name FROM collections").fetchall())
+            for facet in FACET_BUCKETS:
+                query, params = facet_query(facet, filters)
+                facets[facet] = conn.execute(query, params).fetchall()
+
+        def counts(rows, label=lambda value: value):
+            merged = {}
+            for bucket, count in rows:
+                if count:
+                    value = None if bucket == -1 else label(bucket)
+                    merged[value] = merged.get(value, 0) + count
+            return [{"value": value, "count": count} for value, count in sorted(merged.items(), key=lambda item: (item[0] is None, item[0]))]
+
+        return dumps({
+            # No facet filters on diameter, so its counts add up to the full result count
+            "total": sum(count for _, count in facets["diameter"]),
+            "year": counts(facets["year"], (lambda year: year // 10 * 10) if year_bucket == "decade" else (lambda year: year)),
+            "type": counts(facets["type"], lambda collection_id: names.get(collection_id, str(collection_id))),
+            "diameter": counts(facets["diameter"]),
+            "hue": counts(facets["hue"], lambda sector: sector * 30),
+        }), {}
+
+    return cached_response(("facets", filters_key(filters), year_bucket), compute)
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters and size of this worker's result cache."""
+    return result_cache.stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """This worker's request latencies, span timings, row and byte counters (Prometheus text format)."""
+    stats = result_cache.stats()
+    gauges = [
+        ("app_result_cache_hits", "Result cache hits since startup.", stats["hits"]),
+        ("app_result_cache_misses", "Result cache misses since startup.", stats["misses"]),
+        ("app_result_cache_bytes", "Bytes held by the in-memory result cache.", stats["bytes"]),
+        ("app_archive_files", "Files in the archive index.", len(archive)),
+        ("app_profiling_enabled", "1 when ?profile=1 is available (PROFILING=1).", int(PROFILING)),
+    ]
+    return Response(render_metrics(gauges), media_type="text/plain; version=0.0.4")
+
+##############################################################################################################################
+##############################################################################################################################
+
+class MemoryViewResponse(Response):
+    """A response whose body is a memoryview (a slice of the pack mapping), sent without copying it."""
+
+    def render(self, content):
+        return content
+
+def packed_image(filename, entry, request):
+    """An original image from the pack, honoring conditional and Range requests."""
+    digest, _, size, mtime_ns = entry
+    headers = {**cache_headers(f'"{digest}"', mtime_ns), "Accept-Ranges": "bytes"}
+    if is_not_modified(request.headers, headers["ETag"], mtime_ns):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    wanted = byte_range(request.headers, headers["ETag"], size)
+    if wanted == "unsatisfiable":
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if wanted is None:
+        return MemoryViewResponse(pack.read(filename), media_type=media_type, headers=headers)
+    start, end = wanted
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return MemoryViewResponse(pack.read(filename, start, end), status_code=206, media_type=media_type, headers=headers)
+
 @app.get("/image/{filename}")
-def get_image(filename: str):
-    image_path = os.path.join(IMAGE_FOLDER, filename)
-    if os.path.exists(image_path):
-        return FileResponse(image_path)
-    else:
-        return {"error": "Image not found"}
+def get_image(
+    filename: str,
+    request: Request,
+    w: int = Query(None, gt=0, description="Display width in px; the closest pre-sized rendition at least this wide is served"),
+    format: str = Query(None, description="Rendition format: 'webp' or 'jpeg' (default: webp if the browser accepts it)"),
+):
+    if pack is not None and not w:
+        with span("pack_lookup"):
+            entry = pack.get(filename)
+        if entry is not None:
+            return packed_image(filename, entry, request)
+
+    with span("archive_check"):
+        found = filename in archive
+    if not found:
+        raise HTTPException(status_code=404, detail="Image not found")
+    with span("content_hash"):
+        digest = archive.content_hash(filename)  # hashed once per file version, then served from memory
+    stat = archive.get(filename)  # size/mtime as of that check
+    if digest is None or stat is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    _, mtime_ns = stat
+
+    width = nearest_width(w) if w else None
+    if width is None:
+        headers = cache_headers(f'"{digest}"', mtime_ns)
+        if is_not_modified(request.headers, headers["ETag"], mtime_ns):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(archive.path(filename), headers=headers)
+
+    negotiated = format not in RENDITION_FORMATS
+    if negotiated:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    headers = cache_headers(f'"{digest}-{width}-{format}"', mtime_ns)
+    if negotiated:
+        headers["Vary"] = "Accept"
+    if is_not_modified(request.headers, headers["ETag"], mtime_ns):
+        return Response(status_code=304, headers=headers)
+
+    with span("rendition"):
+        try:
+            path = renditions.get(filename, width, format)
+        except ValueError:
+            if not os.path.exists(archive.path(filename)):
+                path = None
+            else:
+                # In the archive but not an image OpenCV can read: the original is still served without w
+                raise HTTPException(status_code=415, detail="Image can't be resized")
+    if path is None:
+        # Removed from the archive since the check above
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type=RENDITION_FORMATS[format][1], headers=headers)
+
+@app.post("/archive/refresh")
+def refresh_archive():
+    """Re-scan the archive folder right away (e.g. after copying in new images)."""
+    return {"files": archive.refresh()}
 
 ##############################################################################################################################
 ##############################################################################################################################
@@ -212,16 +608,20 @@ def get_image(filename: str):
 #     return sorted(list(suggestions))[:10]
 
 @app.get("/suggestions")
-def get_suggestions(q: str = Query(..., description="Partial search term for suggestions")):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT title FROM images WHERE title IS NOT NULL")
-    rows = cursor.fetchall()
-    suggestions = []
-    for row in rows:
-        title = row["title"]
-        if title.lower().startswith(q.lower()):
-            suggestions.append(title)
-    conn.close()
-    return sorted(suggestions)[:10]
+def get_suggestions(
+    q: str = Query(..., description="Partial search term for suggestions"),
+    match: str = Query("title", description="'title' matches the start of titles; 'words' matches any word in titles and OCR text"),
+    rank: str = Query("alpha", description="'alpha' for alphabetical order, 'frequency' for most common first"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of suggestions"),
+):
+    match = "words" if match == "words" else "title"
+    rank = "frequency" if rank == "frequency" else "alpha"
+
+    def compute():
+        with span("lookup"):
+            suggestions = suggestion_index.lookup(q, limit, match, rank)
+        ROWS_RETURNED.inc(len(suggestions), endpoint="suggestions")
+        with span("json_encode"):
+            return dumps(suggestions), {}
 
+    return cached_response(("suggestions", q.casefold(), match, rank, limit), compute)
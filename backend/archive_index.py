@@ -0,0 +1,104 @@
+import hashlib
+import os
+import threading
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ArchiveIndex:
+    """
+    In-memory listing of the image archive: filename -> (size, mtime_ns).
+    Built with a single os.scandir so request handlers can check for a file
+    with a dict lookup instead of a stat() call. refresh_if_changed() rescans
+    only when the folder's own mtime moves (a file was added, removed or renamed).
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.files = {}
+        self._hashes = {}
+        self._folder_mtime = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller = None
+
+    def refresh(self):
+        folder_mtime = os.stat(self.folder).st_mtime_ns
+        files = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith("."):
+                    st = entry.stat()
+                    files[entry.name] = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            self.files = files  # swap in one go so readers never see a half-built index
+            self._folder_mtime = folder_mtime
+        return len(files)
+
+    def refresh_if_changed(self):
+        if os.stat(self.folder).st_mtime_ns != self._folder_mtime:
+            self.refresh()
+
+    @property
+    def folder_mtime(self):
+        """Folder mtime at the last scan: changes whenever a file was added, removed or renamed."""
+        return self._folder_mtime
+
+    def get(self, filename: str):
+        return self.files.get(filename)
+
+    def __contains__(self, filename):
+        return filename in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def path(self, filename: str):
+        return os.path.join(self.folder, filename)
+
+    def content_hash(self, filename: str):
+        """
+        SHA-256 of a file's bytes, computed once per (size, mtime) and kept in memory.
+        The file's own stat is checked each time: overwriting a file under the same name
+        doesn't move the folder mtime, so the scan alone would keep serving the old hash.
+        """
+        if filename not in self.files:
+            return None
+        try:
+            st = os.stat(self.path(filename))
+        except FileNotFoundError:
+            return None
+        stat = (st.st_size, st.st_mtime_ns)
+        if self.files.get(filename) != stat:
+            self.files[filename] = stat  # get() now reports the new size/mtime too
+        cached = self._hashes.get(filename)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+        digest = file_sha256(self.path(filename))
+        self._hashes[filename] = (stat, digest)
+        return digest
+
+    def start_polling(self, interval: float):
+        """Poll the folder every `interval` seconds in a daemon thread."""
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh_if_changed()
+                except OSError as e:
+                    print("Archive poll failed:", e)
+
+        self._stop.clear()
+        self._poller = threading.Thread(target=poll, name="archive-index-poller", daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
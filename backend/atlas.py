@@ -0,0 +1,164 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from renditions import LOCK_STRIPES, RENDITION_FORMATS, write_file
+
+# Largest atlas side (px); pages that wouldn't fit are cut short and continue on the next cursor
+MAX_ATLAS_SIDE = 8192
+
+# Empty cells and letterboxing
+BACKGROUND = 255
+
+
+def atlas_capacity(tile_width: int):
+    """How many tiles of this width fit in one atlas."""
+    per_side = MAX_ATLAS_SIDE // tile_width
+    return per_side * per_side
+
+
+class AtlasCache:
+    """
+    Sprite sheets of small renditions for one page of /images results, so the gallery
+    loads a page with one image request instead of one per button.
+
+    Each tile is a `tile_width` x `tile_width` cell (renditions taller than that are
+    scaled down to fit). Atlases are stored under cache_folder, named by a hash of the
+    tile width, format, the image ids in order and `stamp()` (a change marker for the
+    database and archive): the same page over unchanged data reuses the file without
+    touching the images; any change gets a new one. Next to each atlas, a .json file holds
+    the offset map. The folder is kept under max_bytes, least recently used atlases first.
+    """
+
+    # Every this many builds the folder is re-measured, to count other workers' atlases too
+    DISK_RESCAN_WRITES = 64
+
+    def __init__(self, renditions, cache_folder: str, stamp, max_bytes: int = 512 << 20):
+        self.renditions = renditions
+        self.cache_folder = cache_folder
+        self.stamp = stamp
+        self.max_bytes = max_bytes
+        self._bytes = None  # estimate of the folder size; None = not measured yet
+        self._writes = 0
+        self._bytes_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]  # striped like RenditionCache
+
+    def atlas_key(self, ids, tile_width: int, fmt: str):
+        raw = f"{tile_width}|{fmt}|{self.stamp()!r}|" + ",".join(str(image_id) for image_id in ids)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def atlas_path(self, key: str, fmt: str):
+        return os.path.join(self.cache_folder, key[:2], key + RENDITION_FORMATS[fmt][0])
+
+    def _lock_for(self, key):
+        return self._locks[hash(key) % LOCK_STRIPES]
+
+    def get(self, ids, filenames, tile_width: int, fmt: str):
+        """
+        (key, offset map) for the atlas of these images (ids and their archive files, in
+        order), building it if needed. The map has "width", "height" and "tiles": one
+        {x, y, w, h} per image, in order.
+        """
+        key = self.atlas_key(ids, tile_width, fmt)
+        path = self.atlas_path(key, fmt)
+        map_path = os.path.splitext(path)[0] + ".json"
+
+        with self._lock_for(key):
+            try:
+                os.utime(map_path)  # last use: the least recently used atlases are evicted first
+                with open(map_path) as f:
+                    atlas_map = json.load(f)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(path)
+            except FileNotFoundError:
+                # Not built yet, or evicted (possibly by another worker) in the meantime
+                atlas_map = self._build(filenames, tile_width, fmt, path, map_path)
+        return key, atlas_map
+
+    def _build(self, filenames, tile_width, fmt, path, map_path):
+        columns = max(1, min(math.ceil(math.sqrt(len(filenames))), MAX_ATLAS_SIDE // tile_width))
+        rows = math.ceil(len(filenames) / columns)
+        canvas = np.full((rows * tile_width, columns * tile_width, 3), BACKGROUND, dtype=np.uint8)
+
+        tiles = []
+        for i, filename in enumerate(filenames):
+            rendition = self.renditions.get(filename, tile_width, fmt)
+            tile = cv2.imread(rendition) if rendition is not None else None  # None: removed meanwhile
+            if tile is None:
+                raise ValueError(f"Could not decode the rendition of {filename}")
+            height, width = tile.shape[:2]
+            if height > tile_width:  # taller than wide: shrink to fit the square cell
+                width = max(1, round(width * tile_width / height))
+                height = tile_width
+                tile = cv2.resize(tile, (width, height), interpolation=cv2.INTER_AREA)
+            x, y = (i % columns) * tile_width, (i // columns) * tile_width
+            canvas[y:y + height, x:x + width] = tile
+            tiles.append({"x": x, "y": y, "w": width, "h": height})
+
+        ext, _, params = RENDITION_FORMATS[fmt]
+        ok, encoded = cv2.imencode(ext, canvas, params)
+        if not ok:
+            raise ValueError(f"Could not encode atlas as {fmt}")
+
+        # Image first, then the map: a map on disk always has its atlas next to it
+        atlas_map = {"width": canvas.shape[1], "height": canvas.shape[0], "tiles": tiles}
+        written = 0
+        for target, data in ((path, encoded.tobytes()), (map_path, json.dumps(atlas_map).encode())):
+            write_file(target, data)
+            written += len(data)
+
+        with self._bytes_lock:
+            self._writes += 1
+            rescan = self._bytes is None or self._writes % self.DISK_RESCAN_WRITES == 0
+            if not rescan:
+                self._bytes += written
+                rescan = self._bytes > self.max_bytes
+        if rescan:
+            self._trim()
+        return atlas_map
+
+    def _trim(self):
+        """
+        Measure the folder and delete the least recently used atlases (by their map's mtime)
+        until it is back under 90% of max_bytes (so it isn't trimmed on every build).
+        """
+        atlases, total = {}, 0
+        try:
+            for shard in os.scandir(self.cache_folder):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".tmp"):
+                        continue  # still being written
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue  # removed by another worker meanwhile
+                    stem, ext = os.path.splitext(entry.path)
+                    atlas = atlases.setdefault(stem, [0, 0, []])
+                    atlas[1] += st.st_size
+                    atlas[2].append(entry.path)
+                    if ext == ".json":
+                        atlas[0] = st.st_mtime
+                    total += st.st_size
+        except OSError:
+            return
+
+        if total > self.max_bytes:
+            for _, size, paths in sorted(atlases.values(), key=lambda atlas: atlas[0]):
+                if total <= self.max_bytes * 0.9:
+                    break
+                # The map goes last: a map on disk always has its atlas next to it
+                for path in sorted(paths, key=lambda path: path.endswith(".json")):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+        with self._bytes_lock:
+            self._bytes = total
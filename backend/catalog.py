@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from db import db_stamp
+
+# Sort key used for images without a usable "cm" dimension (same as DIMENSION_SORT in queries.py)
+MISSING_DIMENSION = 999999.0
+
+ROW_COLUMNS = ("id", "title", "date", "type", "dimension", "color", "ocr_text", "filename")
+
+# Typed columns loaded next to ROW_COLUMNS for filtering and sorting
+TYPED_COLUMNS = ("year", "diameter_cm", "hue")
+
+
+class _Snapshot:
+    """One immutable, column-oriented copy of the images table."""
+
+    def __init__(self, rows, stamp):
+        self.stamp = stamp
+        self.rows = [dict(zip(ROW_COLUMNS, row[:len(ROW_COLUMNS)])) for row in rows]
+        year, diameter_cm, hue = (len(ROW_COLUMNS) + i for i in range(len(TYPED_COLUMNS)))
+
+        self.year = np.array([-1 if row[year] is None else row[year] for row in rows], dtype=np.int32)
+        self.has_year = self.year >= 0
+
+        self.type_names = sorted({r["type"] for r in self.rows if r["type"] is not None})
+        type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self.type_code = np.array([type_codes.get(r["type"], -1) for r in self.rows], dtype=np.int16)
+
+        self.hue = np.array([np.nan if row[hue] is None else row[hue] for row in rows], dtype=np.float64)
+
+        self.has_title = np.array([r["title"] is not None for r in self.rows], dtype=bool)
+        self.title_lower = np.array([(r["title"] or "").lower() for r in self.rows], dtype=np.str_)
+
+        # Rows are kept pre-sorted by (dimension, id): every query is a mask over this order
+        for r, row in zip(self.rows, rows):
+            r["sort_key"] = MISSING_DIMENSION if row[diameter_cm] is None else row[diameter_cm]
+        self.sort_key = np.array([r["sort_key"] for r in self.rows], dtype=np.float64)
+        self.ids = np.array([r["id"] for r in self.rows], dtype=np.int64)
+        self.order = np.lexsort((self.ids, self.sort_key))
+
+    def type_mask(self, type):
+        code = self.type_names.index(type) if type in self.type_names else None
+        if code is None:
+            return np.zeros(len(self.rows), dtype=bool)
+        return self.type_code == code
+
+    def mask(self, min_date=None, max_date=None, apply_date=True, type=None,
+             selected_hue=None, hue_tolerance=10.0, keyword=None):
+        mask = np.ones(len(self.rows), dtype=bool)
+
+        if apply_date:
+            if min_date:
+                mask &= self.has_year & (self.year >= min_date)
+            if max_date:
+                mask &= self.has_year & (self.year <= max_date)
+
+        if type:
+            if type == "other":
+                mask &= (self.type_code >= 0) & ~self.type_mask("political-campaigns")
+            else:
+                mask &= self.type_mask(type)
+
+        if keyword:
+            mask &= self.has_title & (np.char.find(self.title_lower, keyword.lower()) >= 0)
+
+        if selected_hue is not None:
+            diff = np.abs(self.hue - selected_hue)
+            diff = np.minimum(diff, 360 - diff)
+            with np.errstate(invalid="ignore"):
+                mask &= diff <= hue_tolerance  # NaN (no color) never matches
+        return mask
+
+    def query(self, after=None, limit=None, **filters):
+        """Matching rows in (dimension, id) order, starting after the (sort key, id) cursor."""
+        mask = self.mask(**filters)
+        if after is not None:
+            sort_key, image_id = after
+            mask &= (self.sort_key > sort_key) | ((self.sort_key == sort_key) & (self.ids > image_id))
+        selected = self.order[mask[self.order]]
+        if limit is not None:
+            selected = selected[:limit]
+        return [self.rows[i] for i in selected]
+
+    def count(self, **filters):
+        return int(self.mask(**filters).sum())
+
+
+class CatalogSnapshot:
+    """
+    Read-mostly cache of the images table for /images.
+    The table is loaded once into NumPy columns and filtered with vectorized masks;
+    it is reloaded automatically whenever the database file changes on disk.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _load(self, stamp):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(ROW_COLUMNS + TYPED_COLUMNS)} FROM images ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+        return _Snapshot(rows, stamp)
+
+    def current(self):
+        stamp = db_stamp(self.db_path)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.stamp != stamp:
+            with self._lock:
+                if self._snapshot is None or self._snapshot.stamp != stamp:
+                    self._snapshot = self._load(stamp)
+                snapshot = self._snapshot
+        return snapshot
+
+    def query(self, **filters):
+        return self.current().query(**filters)
+
+    def count(self, **filters):
+        return self.current().count(**filters)
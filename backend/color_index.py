@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from db import db_stamp
+
+# The Lab space is cut into cubes of CELL_SIZE ΔE units: L goes 0..100, a and b stay
+# within about -128..128 for sRGB colors
+CELL_SIZE = 5.0
+LAB_MIN = np.array([0.0, -128.0, -128.0])
+GRID_SHAPE = (20, 52, 52)
+
+# Palette clusters covering less of the button than this are mostly edges and shadows
+MIN_PALETTE_WEIGHT = 0.1
+
+
+def _cells(lab):
+    return np.clip(((lab - LAB_MIN) // CELL_SIZE).astype(np.int64), 0, np.array(GRID_SHAPE) - 1)
+
+
+class _Grid:
+    """
+    Lab points bucketed by grid cell: one array sorted by cell, plus the start offset and
+    the bounding box of every cell that holds at least one point.
+    """
+
+    def __init__(self, image_ids, lab):
+        flat = np.ravel_multi_index(_cells(lab).T, GRID_SHAPE)
+        order = np.argsort(flat, kind="stable")
+        self.image_ids = image_ids[order]
+        self.lab = lab[order]
+        occupied, starts = np.unique(flat[order], return_index=True)
+        self.starts = np.append(starts, len(flat))
+
+        coords = np.stack(np.unravel_index(occupied, GRID_SHAPE), axis=1)
+        self.cell_low = LAB_MIN + coords * CELL_SIZE
+        self.cell_high = self.cell_low + CELL_SIZE
+        # Cells on the edge of the grid also hold the (rare) points beyond it
+        self.cell_low[coords == 0] = -np.inf
+        self.cell_high[coords == np.array(GRID_SHAPE) - 1] = np.inf
+
+        # Most points one image can have (its palette size)
+        self.per_image = int(np.unique(image_ids, return_counts=True)[1].max()) if len(image_ids) else 1
+
+    def nearest(self, lab, k, max_distance=None):
+        """
+        Up to k (image id, ΔE) pairs, closest first, one per image. Cells are visited in
+        order of their distance to the query, in growing batches, until no unvisited cell
+        can hold anything closer than the k-th image found so far.
+        """
+        query = np.asarray(lab, dtype=np.float64)
+        gap = np.maximum(np.maximum(self.cell_low - query, query - self.cell_high), 0)
+        bounds = np.sqrt((gap ** 2).sum(axis=1))
+        cell_order = np.argsort(bounds)
+
+        found_ids, found_distances = [], []
+        visited, batch = 0, 4
+        while visited < len(cell_order):
+            cells = cell_order[visited:visited + batch]
+            visited += len(cells)
+            batch *= 2
+            # Indexes of every point in these cells
+            starts = self.starts[cells]
+            sizes = self.starts[cells + 1] - starts
+            index = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+            found_ids.append(self.image_ids[index])
+            found_distances.append(np.sqrt(((self.lab[index] - query) ** 2).sum(axis=1)))
+
+            # Nothing in the cells left is closer than this
+            reach = bounds[cell_order[visited]] if visited < len(cell_order) else np.inf
+            if max_distance is not None and reach > max_distance:
+                break
+            if sum(int((d <= reach).sum()) for d in found_distances) >= k:
+                ids, distances = self._closest_per_image(found_ids, found_distances, k)
+                if len(ids) >= k and distances[k - 1] <= reach:
+                    break
+
+        ids, distances = self._closest_per_image(found_ids, found_distances, k)
+        if max_distance is not None:
+            keep = distances <= max_distance
+            ids, distances = ids[keep], distances[keep]
+        return [(int(i), float(d)) for i, d in zip(ids, distances)]
+
+    def _closest_per_image(self, found_ids, found_distances, k):
+        """The k closest images among the points found (closest point per image), sorted by distance."""
+        if not found_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids, distances = np.concatenate(found_ids), np.concatenate(found_distances)
+        # The k * per_image closest points always include the k closest images
+        keep = k * self.per_image
+        if len(distances) > keep:
+            nearest = np.argpartition(distances, keep - 1)[:keep]
+            ids, distances = ids[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        if self.per_image > 1:
+            _, first = np.unique(ids[order], return_index=True)
+            order = order[np.sort(first)]
+        return ids[order][:k], distances[order][:k]
+
+
+class _Index:
+    def __init__(self, colors, palettes, stamp):
+        self.stamp = stamp
+        colors = np.array(colors, dtype=np.float64).reshape(-1, 4)
+        palettes = np.array(palettes, dtype=np.float64).reshape(-1, 4)
+        self.dominant = _Grid(colors[:, 0].astype(np.int64), colors[:, 1:])
+        # Images without a stored palette are matched on their dominant color alone
+        without_palette = colors[~np.isin(colors[:, 0], palettes[:, 0])]
+        points = np.concatenate([palettes, without_palette])
+        self.palette = _Grid(points[:, 0].astype(np.int64), points[:, 1:])
+
+
+class ColorIndex:
+    """
+    Nearest-color search for /images/similar-color: every image's Lab color (and palette)
+    in a uniform grid, built once and rebuilt when the database file changes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load(self, stamp):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            colors = conn.execute("SELECT id, lab_l, lab_a, lab_b FROM images WHERE lab_l IS NOT NULL").fetchall()
+            palettes = conn.execute(
+                "SELECT image_id, lab_l, lab_a, lab_b FROM palettes WHERE weight >= ?", (MIN_PALETTE_WEIGHT,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return _Index(colors, palettes, stamp)
+
+    def current(self):
+        stamp = db_stamp(self.db_path)
+        index = self._index
+        if index is None or index.stamp != stamp:
+            with self._lock:
+                if self._index is None or self._index.stamp != stamp:
+                    self._index = self._load(stamp)
+                index = self._index
+        return index
+
+    def nearest(self, lab, k=20, match="palette", max_distance=None):
+        index = self.current()
+        grid = index.palette if match == "palette" else index.dominant
+        return grid.nearest(lab, k, max_distance)
@@ -0,0 +1,57 @@
+def hex_to_hsl(hex_str: str):
+    """
+    Convert a hex color string (e.g. "#ff0000") to an HSL tuple.
+    Returns a tuple (h, s, l) where:
+      - h is the hue in degrees (0 to 360)
+      - s and l are in the range [0, 1]
+    The stored hue column (2_SQL/migrate_db.py, load_images.py) and the /images hue filter
+    both use this function, so colors on a filter boundary match exactly.
+    """
+    hex_str = hex_str.lstrip('#')
+    if len(hex_str) != 6:
+        # Return a default value if invalid format
+        return (0, 0, 0)
+    r = int(hex_str[0:2], 16) / 255.0
+    g = int(hex_str[2:4], 16) / 255.0
+    b = int(hex_str[4:6], 16) / 255.0
+
+    max_val = max(r, g, b)
+    min_val = min(r, g, b)
+    l = (max_val + min_val) / 2
+
+    if max_val == min_val:
+        h = 0
+        s = 0
+    else:
+        d = max_val - min_val
+        s = d / (2 - max_val - min_val) if l > 0.5 else d / (max_val + min_val)
+        if max_val == r:
+            h = (g - b) / d + (6 if g < b else 0)
+        elif max_val == g:
+            h = (b - r) / d + 2
+        else:  # max_val == b
+            h = (r - g) / d + 4
+        h /= 6
+    # Convert hue to degrees (0-360)
+    return (h * 360, s, l)
+
+
+def hex_to_lab(hex_str: str):
+    """
+    CIELAB (D65) of an sRGB hex color like "#c0392b", or None if it isn't one.
+    Stored Lab values (2_SQL/migrate_db.py, load_images.py, build_palettes.py) and the
+    /images/similar-color query both use this function, so distances don't drift.
+    """
+    hex_str = hex_str.lstrip("#")
+    if len(hex_str) != 6:
+        return None
+    try:
+        rgb = [int(hex_str[i:i + 2], 16) / 255.0 for i in (0, 2, 4)]
+    except ValueError:
+        return None
+    r, g, b = (c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4 for c in rgb)
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+    fx, fy, fz = (t ** (1 / 3) if t > 0.008856 else 7.787 * t + 16 / 116 for t in (x, y, z))
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
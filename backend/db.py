@@ -0,0 +1,103 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from tracing import span
+
+DB_PATH = "images2.db"
+
+# Applied to every pooled connection: read-only, memory-mapped reads and a larger page cache
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+    "PRAGMA cache_size = -65536",  # 64 MB (negative = KiB)
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def db_stamp(db_path: str):
+    """
+    Cheap change marker for a SQLite file: (mtime, size) of the database and of its
+    -wal file, so commits that haven't been checkpointed yet are noticed too.
+    """
+    stamp = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only SQLite connections shared by the request handlers.
+    Connections are opened lazily (up to `size`), handed to one thread at a time
+    and returned for reuse, so requests skip connect + pragma setup.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = 8, timeout: float = 30.0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # most recently used first: its pages are warm
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Switch the database to WAL so readers never block the ingestion scripts (and vice versa)."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Allows dict-like row access
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError(f"No database connection available after {self.timeout}s") from None
+
+    @contextmanager
+    def connection(self):
+        with span("connect"):
+            conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection (called on app shutdown)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
@@ -0,0 +1,13 @@
+"""JSON encoding straight to bytes: orjson when it's installed, the standard library otherwise."""
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+except ImportError:  # orjson is optional
+    import json
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
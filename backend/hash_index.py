@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+from functools import lru_cache
+from itertools import combinations
+
+from db import db_stamp
+
+# Perceptual hash columns of the images table (see 2_SQL/perceptual_hash.py)
+HASH_KINDS = ("phash", "dhash", "ahash")
+
+# A 64-bit hash is split into 4 chunks of 16 bits for the lookup tables
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def hamming(a: int, b: int):
+    return (a ^ b).bit_count()
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(bits):
+    """Every 16-bit mask with at most `bits` bits set."""
+    return tuple(
+        sum(1 << i for i in positions) for n in range(bits + 1) for positions in combinations(range(CHUNK_BITS), n)
+    )
+
+
+class MultiIndexHash:
+    """
+    Hamming-radius search over 64-bit hashes (multi-index hashing): one table per 16-bit
+    chunk. Two hashes within r bits of each other differ by at most r // 4 bits in at least
+    one chunk, so only the buckets of chunk values that close have to be checked.
+    """
+
+    def __init__(self):
+        self.items = {}  # hash -> [items]; images with identical hashes share an entry
+        self.tables = [{} for _ in range(CHUNKS)]
+
+    def add(self, value: int, item):
+        items = self.items.get(value)
+        if items is not None:
+            items.append(item)
+            return
+        self.items[value] = [item]
+        for chunk, table in enumerate(self.tables):
+            table.setdefault((value >> (chunk * CHUNK_BITS)) & CHUNK_MASK, []).append(value)
+
+    def search(self, value: int, radius: int):
+        """[(distance, item), ...] for every hash within `radius` bits, closest first."""
+        masks = _flip_masks(radius // CHUNKS)
+        candidates = set()
+        for chunk, table in enumerate(self.tables):
+            key = (value >> (chunk * CHUNK_BITS)) & CHUNK_MASK
+            for mask in masks:
+                bucket = table.get(key ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+
+        results = []
+        for other in candidates:
+            distance = hamming(value, other)
+            if distance <= radius:
+                results.extend((distance, item) for item in self.items[other])
+        results.sort()
+        return results
+
+
+class _Index:
+    def __init__(self, rows, stamp):
+        self.stamp = stamp
+        self.hashes = {}  # image id -> {kind: int}
+        self.tables = {kind: MultiIndexHash() for kind in HASH_KINDS}
+        for image_id, *values in rows:
+            self.hashes[image_id] = {}
+            for kind, value in zip(HASH_KINDS, values):
+                if value is not None:
+                    self.hashes[image_id][kind] = int(value, 16)
+                    self.tables[kind].add(int(value, 16), image_id)
+
+
+class HashIndex:
+    """
+    Near-duplicate search for /images/{id}/similar: a multi-index hash table per hash kind,
+    built once from the images table and rebuilt when the database file changes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load(self, stamp):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                f"SELECT id, {', '.join(HASH_KINDS)} FROM images WHERE phash IS NOT NULL OR dhash IS NOT NULL OR ahash IS NOT NULL"
+            ).fetchall()
+        finally:
+            conn.close()
+        return _Index(rows, stamp)
+
+    def current(self):
+        stamp = db_stamp(self.db_path)
+        index = self._index
+        if index is None or index.stamp != stamp:
+            with self._lock:
+                if self._index is None or self._index.stamp != stamp:
+                    self._index = self._load(stamp)
+                index = self._index
+        return index
+
+    def similar(self, image_id: int, kind="phash", max_distance=10, limit=20):
+        """
+        [(image id, distance), ...] of the other images within max_distance bits of this one,
+        closest first; None if the image has no hash of that kind.
+        """
+        index = self.current()
+        value = index.hashes.get(image_id, {}).get(kind)
+        if value is None:
+            return None
+        matches = index.tables[kind].search(value, max_distance)
+        return [(other, distance) for distance, other in matches if other != image_id][:limit]
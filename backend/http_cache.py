@@ -0,0 +1,71 @@
+from email.utils import formatdate, parsedate_to_datetime
+
+# URLs named by a content hash (atlases) never change, so browsers/CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# URLs named by filename (/image/{filename}, with or without w) can get new bytes when a file is
+# replaced and re-ingested: keep them, but revalidate with the ETag (a 304 while unchanged)
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def cache_headers(etag: str, mtime_ns: int, cache_control: str = REVALIDATE_CACHE_CONTROL):
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime_ns / 1e9, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+
+def _strip_weak(tag: str):
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request_headers, etag: str, mtime_ns: int):
+    """
+    True when a conditional GET can be answered with 304 (RFC 9110 section 13.2.2:
+    If-None-Match wins over If-Modified-Since, and uses weak comparison).
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        wanted = _strip_weak(etag)
+        return any(_strip_weak(tag.strip()) == wanted for tag in if_none_match.split(","))
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime_ns / 1e9) <= since  # HTTP dates only have second precision
+    return False
+
+
+def byte_range(request_headers, etag: str, size: int):
+    """
+    The (start, end) byte range (inclusive) asked for by a Range header, None to send the
+    whole file, or "unsatisfiable" for a 416. Only single ranges are honored; multi-range
+    requests and If-Range mismatches get the full file, as RFC 9110 section 14.2 allows.
+    """
+    header = request_headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if_range = request_headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # "bytes=-500": the last 500 bytes
+            suffix = int(last)
+            if suffix <= 0:
+                return "unsatisfiable"
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
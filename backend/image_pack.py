@@ -0,0 +1,123 @@
+import json
+import mmap
+import os
+import threading
+
+# A pack is two files next to each other: the blob (every image's bytes back to back, each
+# distinct file stored once) and a JSON index mapping filenames into it. Both are written
+# by 2_SQL/build_pack.py; the blob is only ever appended to, so a running server keeps
+# reading its mapping while new images are added. The index names its blob, so a rebuild
+# writes a new blob under a new name and replacing the index switches readers over at once.
+PACK_MAGIC = b"OPBPACK1"
+INDEX_VERSION = 1
+
+
+def index_path(pack_path: str):
+    return pack_path + ".idx"
+
+
+def read_index(pack_path: str):
+    """
+    {"blob": blob file name (next to the index), "pack_size": bytes of the blob the index covers,
+     "files": {filename: [sha256, offset, size, mtime_ns]}}; an empty index if there is none.
+    """
+    try:
+        with open(index_path(pack_path)) as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = {"version": INDEX_VERSION, "pack_size": 0, "files": {}}
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"{index_path(pack_path)} has index version {index.get('version')}, expected {INDEX_VERSION}")
+    index.setdefault("blob", os.path.basename(pack_path))
+    return index
+
+
+def blob_path(pack_path: str, index):
+    return os.path.join(os.path.dirname(pack_path), index["blob"])
+
+
+def write_index(pack_path: str, index):
+    """Replace the index in one rename, so readers see the old or the new one, never half of it."""
+    path = index_path(pack_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({**index, "version": INDEX_VERSION}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _Pack:
+    def __init__(self, pack_path, stamp):
+        self.stamp = stamp
+        self.view = None
+        for attempt in range(3):
+            index = read_index(pack_path)
+            if not index["pack_size"]:
+                break
+            try:
+                f = open(blob_path(pack_path, index), "rb")
+            except FileNotFoundError:
+                # A rebuild replaced the index and removed the old blob in between: read it again
+                if attempt == 2:
+                    raise
+                continue
+            with f:
+                if f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                    raise ValueError(f"{f.name} is not an image pack")
+                # Only map what the index covers; anything appended after it was written is ignored
+                self._map = mmap.mmap(f.fileno(), index["pack_size"], access=mmap.ACCESS_READ)
+            self.view = memoryview(self._map)
+            break
+        self.files = {name: tuple(entry) for name, entry in index["files"].items()}
+
+
+class ImagePack:
+    """
+    Archive images served out of one memory-mapped pack file instead of one file each:
+    a lookup is a dict access and the bytes come straight from the page cache. The
+    mapping is replaced when build_pack.py writes a new index.
+    """
+
+    def __init__(self, pack_path: str):
+        self.pack_path = pack_path
+        self._pack = None
+        self._lock = threading.Lock()
+
+    def _stamp(self):
+        try:
+            st = os.stat(index_path(self.pack_path))
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def current(self):
+        stamp = self._stamp()
+        pack = self._pack
+        if pack is None or pack.stamp != stamp:
+            with self._lock:
+                if self._pack is None or self._pack.stamp != stamp:
+                    # Requests still reading the old mapping keep it alive until they finish
+                    self._pack = _Pack(self.pack_path, stamp)
+                pack = self._pack
+        return pack
+
+    def get(self, filename: str):
+        """(sha256, offset, size, mtime_ns) of a packed file, or None if it isn't in the pack."""
+        return self.current().files.get(filename)
+
+    def read(self, filename: str, start: int = 0, end: int = None):
+        """
+        The bytes start..end (inclusive, like an HTTP range) of a packed file as a memoryview
+        into the mapping (no copy), or None if it isn't in the pack.
+        """
+        pack = self.current()
+        entry = pack.files.get(filename)
+        if entry is None:
+            return None
+        _, offset, size, _ = entry
+        end = size - 1 if end is None else min(end, size - 1)
+        return pack.view[offset + start:offset + end + 1]
+
+    def __len__(self):
+        return len(self.current().files)
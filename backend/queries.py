@@ -0,0 +1,213 @@
+import base64
+import json
+import re
+
+# Columns /images can return (image_url is derived from filename, or title/date/type/dimension)
+IMAGE_COLUMNS = ("id", "title", "date", "type", "dimension", "color", "ocr_text", "filename")
+
+# Numeric dimension, small to big; images without a "cm" dimension (diameter_cm IS NULL)
+# sort as if they had a very large value. Must stay identical to the expression in the
+# idx_images_sort / idx_images_collection_sort indexes (2_SQL/migrate_db.py).
+DIMENSION_SORT = "COALESCE(images.diameter_cm, 999999)"
+
+# Type names are stored once in the collections lookup table
+COLLECTION_ID = "(SELECT id FROM collections WHERE name = ?)"
+
+# Full-text relevance (lower is better); title hits count more than OCR text hits
+RELEVANCE_SORT = "bm25(images_fts, 10.0, 1.0)"
+
+# /facets: (facet_counts column, bucket of an images row) per facet; -1 stands for "unknown".
+# Must stay identical to FACET_BUCKET_SQL in 2_SQL/migrate_db.py (which fills facet_counts).
+FACET_BUCKETS = {
+    "year": ("year", "COALESCE(images.year, -1)"),
+    "type": ("collection_id", "COALESCE(images.collection_id, -1)"),
+    "diameter": ("diameter_bucket", "COALESCE(CAST(images.diameter_cm AS INTEGER), -1)"),
+    "hue": ("hue_bucket", "COALESCE(MIN(CAST(images.hue / 30 AS INTEGER), 11), -1)"),
+}
+
+# The filter each facet leaves out, so e.g. the year counts still cover years outside the
+# selected range (there is no diameter filter)
+FACET_OWN_FILTER = {"year": {"apply_date": False}, "type": {"type": None}, "diameter": {}, "hue": {"selected_hue": None}}
+
+
+def date_range_clause(min_date, max_date, column: str = "images.year"):
+    """SQL condition for the /images date range; empty when neither bound is set."""
+    if min_date and max_date:
+        return f" AND {column} BETWEEN ? AND ?", [min_date, max_date]
+    if min_date:
+        return f" AND {column} >= ?", [min_date]
+    if max_date:
+        return f" AND {column} <= ?", [max_date]
+    return "", []
+
+
+def type_clause(type, column: str = "images.collection_id", unknown: str = "NULL"):
+    """SQL condition for the /images type filter ("other" = any known type but political-campaigns)."""
+    if not type:
+        return "", []
+    if type == "other":
+        return f" AND {column} IS NOT {unknown} AND {column} IS NOT {COLLECTION_ID}", ["political-campaigns"]
+    return f" AND {column} = {COLLECTION_ID}", [type]
+
+
+# Slack added to the indexed hue window; far above float rounding, far below any real hue gap
+HUE_EPSILON = 1e-9
+
+
+def hue_range_clause(selected_hue: float, hue_tolerance: float, column: str = "hue"):
+    """
+    Build a SQL condition on the indexed `hue` column matching every hue within
+    hue_tolerance degrees of selected_hue on the color wheel.
+    Returns (sql, params); the window is split in two when it wraps past 0/360.
+    The window is padded by HUE_EPSILON for the index and the exact distance is checked
+    on top, computed like CatalogSnapshot does, so rounding in selected_hue ± hue_tolerance
+    can't move a hue sitting right on the edge in or out.
+    """
+    if hue_tolerance >= 180:
+        return f" AND {column} IS NOT NULL", []
+    low = selected_hue - hue_tolerance - HUE_EPSILON
+    high = selected_hue + hue_tolerance + HUE_EPSILON
+    if low < 0:
+        window, params = f"({column} >= ? OR {column} <= ?)", [low + 360, high]
+    elif high > 360:
+        window, params = f"({column} >= ? OR {column} <= ?)", [low, high - 360]
+    else:
+        window, params = f"{column} BETWEEN ? AND ?", [low, high]
+    distance = f"abs(? - {column})"
+    exact = f"(CASE WHEN {distance} > 180 THEN 360 - {distance} ELSE {distance} END) <= ?"
+    return f" AND {window} AND {exact}", params + [selected_hue, selected_hue, selected_hue, hue_tolerance]
+
+
+def fts_query(keyword: str):
+    """
+    Turn free text into an FTS5 query: every word must match, each as a prefix
+    ("ken for" -> '"ken"* "for"*'). Returns None if the keyword has no words.
+    """
+    words = re.findall(r"\w+", keyword)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def encode_cursor(sort_key, image_id):
+    """Opaque keyset cursor pointing just after the row (sort_key, image_id)."""
+    raw = json.dumps([sort_key, image_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor. Raises ValueError for anything that isn't one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, image_id = json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor") from None
+    if not isinstance(sort_key, (int, float)) or not isinstance(image_id, int):
+        raise ValueError("invalid cursor")
+    return sort_key, image_id
+
+
+class ImageQuery:
+    """
+    The /images filters turned into SQL once, reusable for a page of rows
+    (keyset-paginated on (sort key, id)) or for a bare COUNT(*).
+    """
+
+    def __init__(self, min_date=None, max_date=None, apply_date=True, type=None,
+                 selected_hue=None, hue_tolerance=10.0, keyword=None, keyword_mode="like"):
+        match = fts_query(keyword) if keyword and keyword_mode == "fts" else None
+
+        if match:
+            self.from_sql = "images JOIN images_fts ON images_fts.rowid = images.id"
+            where, params = " WHERE images_fts MATCH ?", [match]
+            self.sort = RELEVANCE_SORT
+        else:
+            self.from_sql = "images"
+            where, params = " WHERE 1=1", []
+            self.sort = DIMENSION_SORT
+
+        # Date range filtering on the integer year: only apply if apply_date is True
+        if apply_date:
+            date_sql, date_params = date_range_clause(min_date, max_date)
+            where += date_sql
+            params.extend(date_params)
+
+        # Type filtering
+        type_sql, type_params = type_clause(type)
+        where += type_sql
+        params.extend(type_params)
+
+        # Keyword filtering (substring match on the title)
+        if keyword and not match:
+            where += " AND images.title LIKE ?"
+            params.append(f"%{keyword}%")
+
+        # Hue filtering: keep images whose precomputed hue lies within hue_tolerance
+        # of the selected hue (wrapping around 0/360 degrees).
+        # COUNT(*) can use the hue index. A page of rows instead reads the sort index in
+        # order and stops at LIMIT; "+hue" keeps SQLite from picking the hue index and
+        # sorting every match in a temp B-tree (see 2_SQL/check_query_plans.py).
+        self.ordered_where_sql = where
+        if selected_hue is not None:
+            hue_sql, hue_params = hue_range_clause(selected_hue, hue_tolerance)
+            where += hue_sql
+            self.ordered_where_sql += hue_range_clause(selected_hue, hue_tolerance, column="+images.hue")[0]
+            params.extend(hue_params)
+
+        self.where_sql = where
+        self.params = params
+
+    def select(self, columns=IMAGE_COLUMNS, after=None, limit=None):
+        """
+        SQL for the matching rows in (sort key, id) order, plus a `sort_key` column.
+        `after` is a decoded cursor; ties on the sort key are broken by id so the order
+        doesn't depend on which index SQLite picks and pages never overlap.
+        """
+        column_sql = ", ".join(f"images.{c}" for c in columns)
+        sql = f"SELECT {column_sql}, {self.sort} AS sort_key FROM {self.from_sql}{self.ordered_where_sql}"
+        params = list(self.params)
+        if after is not None:
+            # Row-value comparison, so SQLite can start the index scan at the cursor
+            sql += f" AND ({self.sort}, images.id) > (?, ?)"
+            params.extend(after)
+        sql += f" ORDER BY {self.sort} ASC, images.id ASC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    def count(self):
+        return f"SELECT COUNT(*) FROM {self.from_sql}{self.where_sql}", list(self.params)
+
+    def facet(self, facet):
+        """(bucket, count) rows of one /facets facet, counted over the matching images."""
+        bucket = FACET_BUCKETS[facet][1]
+        return f"SELECT {bucket} AS bucket, COUNT(*) FROM {self.from_sql}{self.where_sql} GROUP BY bucket", list(self.params)
+
+
+def facet_query(facet, filters):
+    """
+    SQL for the (bucket, count) rows of one facet under the /images filters, minus the facet's
+    own filter. Summed from facet_counts (a few hundred cells) when the filters only touch
+    year and type; keyword and hue-range filters need the images themselves.
+    """
+    filters = {**filters, **FACET_OWN_FILTER[facet]}
+    if filters["keyword"] or filters["selected_hue"] is not None:
+        return ImageQuery(**filters).facet(facet)
+
+    where, params = " WHERE 1=1", []
+    if filters["apply_date"]:
+        date_sql, params = date_range_clause(filters["min_date"], filters["max_date"], column="year")
+        if date_sql:
+            where += " AND year != -1" + date_sql
+    type_sql, type_params = type_clause(filters["type"], column="collection_id", unknown="-1")
+    where += type_sql
+    params.extend(type_params)
+    column = FACET_BUCKETS[facet][0]
+    return f"SELECT {column} AS bucket, SUM(count) FROM facet_counts{where} GROUP BY bucket", params
+
+
+def select_by_ids(columns, count):
+    """SQL for the images rows with `count` given ids (pass the ids as parameters), in no particular order."""
+    column_sql = ", ".join(f"images.{c}" for c in columns)
+    return f"SELECT {column_sql} FROM images WHERE images.id IN ({', '.join('?' * count)})"
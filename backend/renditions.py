@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+
+import cv2
+
+# Fixed widths (px) the gallery can ask for; anything wider is served from the original
+RENDITION_WIDTHS = (64, 128, 256, 512)
+
+# Builds of different renditions that hash to the same stripe wait for each other; a fixed
+# pool keeps memory flat however many renditions are ever requested
+LOCK_STRIPES = 64
+
+# format name -> (file extension, media type, OpenCV encoder params)
+RENDITION_FORMATS = {
+    "webp": (".webp", "image/webp", [cv2.IMWRITE_WEBP_QUALITY, 80]),
+    "jpeg": (".jpg", "image/jpeg", [cv2.IMWRITE_JPEG_QUALITY, 85]),
+}
+
+
+def write_file(path: str, data: bytes):
+    """
+    Write to a temp file of our own and rename it into place, so readers never see a partial
+    file and other threads or uvicorn workers building the same one never share a temp file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def nearest_width(width: int):
+    """Smallest rendition at least `width` px wide, or None when only the original is big enough."""
+    for candidate in RENDITION_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return None
+
+
+class RenditionCache:
+    """
+    Resized copies of archive images, stored under cache_folder by the SHA-256 of the
+    source file (so identical buttons share renditions and edited files get new ones).
+    Renditions are built in bulk by 2_SQL/build_renditions.py or lazily on first request.
+    """
+
+    def __init__(self, archive, cache_folder: str):
+        self.archive = archive
+        self.cache_folder = cache_folder
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def rendition_path(self, digest: str, width: int, fmt: str):
+        ext = RENDITION_FORMATS[fmt][0]
+        return os.path.join(self.cache_folder, digest[:2], f"{digest}_{width}{ext}")
+
+    def _lock_for(self, key):
+        return self._locks[hash(key) % LOCK_STRIPES]
+
+    def get(self, filename: str, width: int, fmt: str):
+        """Path to the `width`/`fmt` rendition of an archive file, creating it if needed."""
+        digest = self.archive.content_hash(filename)
+        if digest is None:
+            return None
+        path = self.rendition_path(digest, width, fmt)
+        if os.path.exists(path):
+            return path
+
+        # One thread builds a given rendition; others wait and then reuse the file
+        with self._lock_for(path):
+            if not os.path.exists(path):
+                self._build(self.archive.path(filename), {width: path}, fmt)
+        return path
+
+    def build(self, filename: str, widths=RENDITION_WIDTHS, formats=tuple(RENDITION_FORMATS)):
+        """Create every missing rendition of one file. Returns how many were written."""
+        digest = self.archive.content_hash(filename)
+        written = 0
+        img = None
+        for fmt in formats:
+            targets = {w: self.rendition_path(digest, w, fmt) for w in widths}
+            targets = {w: p for w, p in targets.items() if not os.path.exists(p)}
+            if targets:
+                img = self._build(self.archive.path(filename), targets, fmt, img)
+                written += len(targets)
+        return written
+
+    def _build(self, source_path, targets, fmt, img=None):
+        if img is None:
+            img = cv2.imread(source_path)
+            if img is None:
+                raise ValueError(f"Could not decode {source_path}")
+        height, width = img.shape[:2]
+        _, _, params = RENDITION_FORMATS[fmt]
+        ext = RENDITION_FORMATS[fmt][0]
+
+        for target_width, path in targets.items():
+            if target_width < width:
+                target_height = max(1, round(height * target_width / width))
+                resized = cv2.resize(img, (target_width, target_height), interpolation=cv2.INTER_AREA)
+            else:
+                resized = img  # never upscale
+            ok, encoded = cv2.imencode(ext, resized, params)
+            if not ok:
+                raise ValueError(f"Could not encode {source_path} as {fmt}")
+
+            write_file(path, encoded.tobytes())
+        return img
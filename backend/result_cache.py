@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of serialized responses (body bytes + headers), bounded by total size.
+
+    `stamp` is a callable returning a cheap change marker for everything a response depends
+    on (database file, archive folder). Whenever it changes, every cached response is dropped.
+    With a `folder`, entries are also written to disk under a directory named after the
+    stamp, so other uvicorn workers serving the same data can reuse them. The disk copy has
+    its own size budget (max_disk_bytes); the oldest files go first when it is exceeded.
+    """
+
+    # Every this many writes the disk tier is re-measured, to count other workers' files too
+    DISK_RESCAN_WRITES = 256
+
+    def __init__(self, stamp, max_bytes: int = 64 << 20, ttl: float = 300.0, folder: str = None,
+                 max_disk_bytes: int = 256 << 20):
+        self.stamp = stamp
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.folder = folder if max_disk_bytes > 0 else None
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_bytes = None  # estimate for the current generation; None = not measured yet
+        self._disk_writes = 0
+        self._entries = OrderedDict()  # key -> (expires, body, headers)
+        self._bytes = 0
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _current_generation(self):
+        generation = hashlib.sha256(repr(self.stamp()).encode()).hexdigest()[:16]
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self._entries.clear()
+                    self._bytes = 0
+                    self._generation = generation
+                    self._disk_bytes = None
+                    self._prune_disk(generation)
+        return generation
+
+    def _prune_disk(self, generation):
+        """Remove on-disk entries written for older data (best effort: another worker may be at it too)."""
+        if not self.folder or not os.path.isdir(self.folder):
+            return
+        for name in os.listdir(self.folder):
+            if name != generation:
+                shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+
+    def _disk_path(self, generation, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.folder, generation, name[:2], name)
+
+    def _get(self, generation, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], entry[2]
+                self._remove(key)
+
+        if self.folder:
+            path = self._disk_path(generation, key)
+            try:
+                expires = os.stat(path).st_mtime + self.ttl
+                if expires > now:
+                    with open(path, "rb") as f:
+                        headers, body = f.read().split(b"\n", 1)
+                    headers = json.loads(headers)
+                    self._store(key, body, headers, expires=expires)
+                    with self._lock:
+                        self.hits += 1
+                        self.disk_hits += 1
+                    return body, headers
+                os.remove(path)  # expired: nobody will read it again
+            except (OSError, ValueError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remove(self, key):
+        _, body, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def _store(self, key, body, headers, expires):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires, body, headers)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _write_disk(self, generation, key, body, headers):
+        path = self._disk_path(generation, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps(headers).encode() + b"\n" + body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("Result cache write failed:", e)
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            rescan = self._disk_bytes is None or self._disk_writes % self.DISK_RESCAN_WRITES == 0
+            if not rescan:
+                self._disk_bytes += len(body)
+                rescan = self._disk_bytes > self.max_disk_bytes
+        if rescan:
+            self._trim_disk(generation)
+
+    def _trim_disk(self, generation):
+        """
+        Measure the disk tier of this generation, delete expired files, then the oldest ones
+        until it is back under 90% of max_disk_bytes (so it isn't trimmed on every write).
+        """
+        folder = os.path.join(self.folder, generation)
+        now = time.time()
+        files, total = [], 0
+        try:
+            for shard in os.scandir(folder):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue  # removed by another worker meanwhile
+                    if st.st_mtime + self.ttl <= now:
+                        self._unlink(entry.path)
+                        continue
+                    files.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return
+
+        if total > self.max_disk_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_disk_bytes * 0.9:
+                    break
+                self._unlink(path)
+                total -= size
+        with self._lock:
+            if self._generation == generation:
+                self._disk_bytes = total
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached (body, headers) for `key`, or compute() -> (body, headers) on a miss.
+        Returns (body, headers, hit). A result computed while the data changed isn't kept.
+        """
+        if self.max_bytes <= 0:
+            return (*compute(), False)
+
+        generation = self._current_generation()
+        cached = self._get(generation, key)
+        if cached is not None:
+            return (*cached, True)
+
+        body, headers = compute()
+        if self._current_generation() == generation:
+            self._store(key, body, headers, expires=time.time() + self.ttl)
+            if self.folder:
+                self._write_disk(generation, key, body, headers)
+        return body, headers, False
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes if self.folder else None,
+            }
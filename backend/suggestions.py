@@ -0,0 +1,114 @@
+import heapq
+import re
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from db import db_stamp
+
+# Where a new word starts inside a title like "Kennedy-for-President" or "Carter/Mondale"
+WORD_START = re.compile(r"(?<![^\W_])[^\W_]")
+
+# OCR output is noisy; only alphabetic tokens of a few letters are worth suggesting
+OCR_TOKEN = re.compile(r"[^\W\d_]{3,}")
+
+
+class _Entries:
+    """Parallel sorted arrays: casefolded key -> (suggestion, weight)."""
+
+    def __init__(self, triples):
+        triples.sort()
+        self.keys = [key for key, _, _ in triples]
+        self.values = [value for _, value, _ in triples]
+        self.weights = [weight for _, _, weight in triples]
+
+    def matches(self, prefix):
+        """Yield the position of every key starting with prefix, in key order."""
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            yield i
+            i += 1
+
+
+class _Index:
+    def __init__(self, titles, ocr_texts, stamp):
+        self.stamp = stamp
+        title_counts = Counter(titles)
+
+        # Whole-title prefixes (the classic behaviour)
+        self.titles = _Entries([(t.casefold(), t, n) for t, n in title_counts.items()])
+
+        # Prefixes of every word start inside a title, plus OCR tokens
+        word_entries = []
+        for title, n in title_counts.items():
+            folded = title.casefold()
+            for m in WORD_START.finditer(folded):
+                word_entries.append((folded[m.start():], title, n))
+
+        token_counts, token_forms = Counter(), {}
+        for text in ocr_texts:
+            for token in OCR_TOKEN.findall(text):
+                key = token.casefold()
+                token_counts[key] += 1
+                token_forms.setdefault(key, Counter())[token] += 1
+        for key, n in token_counts.items():
+            word_entries.append((key, token_forms[key].most_common(1)[0][0], n))
+        self.words = _Entries(word_entries)
+
+    def lookup(self, prefix, limit=10, match="title", rank="alpha"):
+        entries = self.words if match == "words" else self.titles
+        prefix = prefix.casefold()
+
+        if rank == "frequency":
+            # Needs every match in the range: O(log n + m log k)
+            best = {}
+            for i in entries.matches(prefix):
+                value = entries.values[i]
+                best[value] = max(best.get(value, 0), entries.weights[i])
+            return [v for v, _ in heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1], item[0].casefold()))]
+
+        # Alphabetical: stop after `limit` distinct suggestions, O(log n + k)
+        results, seen = [], set()
+        for i in entries.matches(prefix):
+            value = entries.values[i]
+            if value not in seen:
+                seen.add(value)
+                results.append(value)
+                if len(results) == limit:
+                    break
+        return results
+
+
+class SuggestionIndex:
+    """
+    Type-ahead index for /suggestions, built once from the images table and rebuilt
+    when the database file changes. Lookups bisect a sorted array of casefolded keys.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load(self, stamp):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            titles = [row[0] for row in conn.execute("SELECT title FROM images WHERE title IS NOT NULL")]
+            ocr_texts = [row[0] for row in conn.execute("SELECT ocr_text FROM images WHERE ocr_text IS NOT NULL")]
+        finally:
+            conn.close()
+        return _Index(titles, ocr_texts, stamp)
+
+    def current(self):
+        stamp = db_stamp(self.db_path)
+        index = self._index
+        if index is None or index.stamp != stamp:
+            with self._lock:
+                if self._index is None or self._index.stamp != stamp:
+                    self._index = self._load(stamp)
+                index = self._index
+        return index
+
+    def lookup(self, prefix, limit=10, match="title", rank="alpha"):
+        return self.current().lookup(prefix, limit, match, rank)
@@ -0,0 +1,218 @@
+import os
+import sys
+import threading
+import time
+import collections
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+# Opt-in sampling profiler: with PROFILING=1, any request with ?profile=1 returns the
+# collapsed stacks of the threads that served it instead of the normal response
+PROFILING = os.environ.get("PROFILING") == "1"
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "1")) / 1000
+
+# Latency buckets in seconds (Prometheus "le" bounds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, le=None):
+    """Prometheus label set, e.g. {route="/images",le="0.5"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, bound)} {count}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, '+Inf')} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to serve a request, until the last body byte.",
+                            ("route", "method", "status"))
+RESPONSE_BYTES = Counter("http_response_bytes_total", "Response body bytes sent.", ("route",))
+SPAN_SECONDS = Histogram("app_span_duration_seconds", "Time spent in each named phase of a request.", ("span",))
+ROWS_READ = Counter("app_rows_read_total", "Rows read from SQLite or the catalog snapshot.", ("endpoint", "source"))
+ROWS_RETURNED = Counter("app_rows_returned_total", "Rows included in responses.", ("endpoint",))
+METRICS = (REQUEST_SECONDS, RESPONSE_BYTES, SPAN_SECONDS, ROWS_READ, ROWS_RETURNED)
+
+
+def render_metrics(gauges=()):
+    """Prometheus text exposition of every metric, plus (name, help, value) gauges."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, help, value in gauges:
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
+
+
+class _Trace:
+    """Spans of one request, and the threads that worked on it (for the profiler)."""
+
+    def __init__(self):
+        self.spans = []
+        self.threads = set()
+
+
+_current = ContextVar("trace", default=None)
+
+
+@contextmanager
+def span(name):
+    """Time a phase of the current request: recorded in /metrics and the Server-Timing header."""
+    trace = _current.get()
+    if trace is not None:
+        trace.threads.add(threading.get_ident())
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        if trace is not None:
+            trace.spans.append((name, elapsed))
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of a request's threads every PROFILE_INTERVAL seconds."""
+
+    def __init__(self, trace, loop_thread):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.trace = trace
+        self.loop_thread = loop_thread
+        self.stacks = collections.Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(PROFILE_INTERVAL):
+            frames = sys._current_frames()
+            for thread_id in self.trace.threads | {self.loop_thread}:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format: flamegraph.pl, speedscope and inferno read it."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _wants_profile(query_string: bytes):
+    """True when the query string has profile=1 (exactly that parameter, not e.g. xprofile=10)."""
+    return parse_qs(query_string.decode("latin-1")).get("profile") == ["1"]
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware timing every request (including streamed bodies), counting bytes sent
+    and adding a Server-Timing header with the request's spans.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trace = _Trace()
+        token = _current.set(trace)
+        start = time.perf_counter()
+        status = [500]
+        sent = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if trace.spans:
+                    timing = ", ".join(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in trace.spans)
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            elif message["type"] == "http.response.body":
+                sent[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            if PROFILING and _wants_profile(scope.get("query_string", b"")):
+                await self._profile(scope, receive, send, trace)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route=route, method=scope["method"], status=status[0])
+            RESPONSE_BYTES.inc(sent[0], route=route)
+
+    async def _profile(self, scope, receive, send, trace):
+        sampler = _Sampler(trace, threading.get_ident())
+        sampler.start()
+
+        async def discard(message):
+            pass
+
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            sampler.stop()
+        body = sampler.collapsed().encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,93 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from report import save_results, summarize, time_calls
+
+# /images filter combinations (the color ones go through hex_to_hsl in image_filters)
+IMAGE_CASES = {
+    "all": {},
+    "date range": {"min_date": 1940, "max_date": 2000},
+    "political campaigns": {"type": "political-campaigns"},
+    "other types": {"type": "other"},
+    "color": {"color": "#c0392b", "hue_tolerance": 10.0},
+    "wide color": {"color": "#2255aa", "hue_tolerance": 60.0},
+    "keyword (title)": {"keyword": "ken"},
+    "keyword (fts)": {"keyword": "ken", "keyword_mode": "fts"},
+    "everything": {"min_date": 1940, "max_date": 2000, "type": "political-campaigns",
+                   "color": "#c0392b", "hue_tolerance": 30.0, "keyword": "for"},
+}
+
+SUGGESTION_CASES = {
+    "title k": {"q": "k"},
+    "title ken": {"q": "ken"},
+    "words for": {"q": "for", "match": "words"},
+    "words by frequency": {"q": "a", "match": "words", "rank": "frequency"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="In-process latency of the /images, /suggestions and /image handlers (no HTTP)."
+    )
+    parser.add_argument("--data-dir", default=".", help="Folder with images2.db and archive/ (e.g. from synthetic_catalog.py)")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per case")
+    parser.add_argument("--limit", type=int, default=100, help="Page size for the paginated /images cases")
+    parser.add_argument("--catalog", action="store_true", help="Serve /images from the in-memory snapshot (CATALOG_SNAPSHOT=1)")
+    parser.add_argument("--result-cache", action="store_true", help="Leave the response cache on (off by default, it would time cache hits)")
+    args = parser.parse_args()
+
+    # The app reads its settings from the environment and its files relative to the working directory
+    os.chdir(args.data_dir)
+    os.environ["ARCHIVE_POLL_SECONDS"] = "0"
+    if args.catalog:
+        os.environ["CATALOG_SNAPSHOT"] = "1"
+    if not args.result_cache:
+        os.environ["RESULT_CACHE_MB"] = "0"
+    from starlette.requests import Request
+    import app
+
+    app.db_pool.open()
+    app.archive.refresh()
+
+    def images_call(params, limit):
+        filters = app.image_filters(**{
+            "min_date": None, "max_date": None, "apply_date": True, "type": None, "color": None,
+            "hue_tolerance": 10.0, "keyword": None, "keyword_mode": "like", **params,
+        })
+        return lambda: app.get_images(filters=filters, limit=limit, cursor=None, fields=None, format="json")
+
+    results = {"images": {}, "suggestions": {}, "image": {}}
+    print(f"{'case':<45} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    def run(group, name, func):
+        func()  # warm-up (first snapshot load, first rendition, ...)
+        summary = summarize(time_calls(func, args.repeat))
+        results[group][name] = summary
+        print(f"{group + ': ' + name:<45} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}")
+
+    for name, params in IMAGE_CASES.items():
+        # image_filters runs inside the timed call so hex_to_hsl is included
+        run("images", f"{name} (all rows)", lambda p=params: images_call(p, None)())
+        run("images", f"{name} (limit {args.limit})", lambda p=params: images_call(p, args.limit)())
+
+    for name, params in SUGGESTION_CASES.items():
+        call = {"match": "title", "rank": "alpha", "limit": 10, **params}
+        run("suggestions", name, lambda c=call: app.get_suggestions(**c))
+
+    # The handler only: FileResponse streams the file later, outside the timed call
+    filename = next(iter(sorted(app.archive.files)))
+    request = Request({"type": "http", "method": "GET", "path": "/image", "headers": [(b"accept", b"image/webp")]})
+    run("image", "original", lambda: app.get_image(filename, request, w=None, format=None))
+    run("image", "rendition 128px", lambda: app.get_image(filename, request, w=128, format=None))
+
+    query, params = app.ImageQuery().count()
+    with app.db_pool.connection() as conn:
+        results["rows"] = conn.execute(query, params).fetchone()[0]
+    app.db_pool.close()
+    save_results("api", args, results)
+
+
+if __name__ == "__main__":
+    main()
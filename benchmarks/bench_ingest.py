@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "2_SQL"))
+import ocr
+from color_extraction import DEFAULT_STRATEGY, STRATEGIES, extract_dominant_color
+from report import save_results, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-image cost of the load_images.py stages: decode, color, OCR.")
+    parser.add_argument("--folder", default="archive/", help="Folder containing images")
+    parser.add_argument("--sample", type=int, default=50, help="Number of images to time")
+    parser.add_argument("--strategies", nargs="+", default=[DEFAULT_STRATEGY], choices=list(STRATEGIES))
+    parser.add_argument("--ocr-batch", type=int, default=ocr.OCR_BATCH_SIZE, help="Images per tesseract call in the batched run")
+    parser.add_argument("--cache", default="cache/bench-ocr/", help="Scratch folder for preprocessed OCR inputs")
+    args = parser.parse_args()
+
+    filenames = sorted(f for f in os.listdir(args.folder) if f.endswith(".jpg") or f.endswith(".png"))
+    random.seed(0)
+    paths = [os.path.join(args.folder, f) for f in random.sample(filenames, min(args.sample, len(filenames)))]
+    print(f"🔎 Timing {len(paths)} images\n")
+
+    results = {}
+    results["decode"] = summarize([t for path in paths for t in time_calls(lambda: cv2.imread(path), 1)])
+    images = [img for img in (cv2.imread(path) for path in paths) if img is not None]
+
+    for name in args.strategies:
+        results[f"color ({name})"] = summarize(
+            [t for img in images for t in time_calls(lambda: extract_dominant_color(img, name), 1)]
+        )
+
+    if shutil.which(ocr.TESSERACT_CMD) is None:
+        print(f"⚠️ {ocr.TESSERACT_CMD} not found, skipping OCR")
+    else:
+        inputs = [ocr.cached_input(img, hashlib.sha256(img.tobytes()).hexdigest(), cache_folder=args.cache) for img in images]
+        # One tesseract process per image (what extract_text used to cost) vs. batched
+        results["ocr (one process per image)"] = summarize([t for p in inputs for t in time_calls(lambda: ocr.ocr_batch([p]), 1)])
+        start = time.perf_counter()
+        for i in range(0, len(inputs), args.ocr_batch):
+            ocr.ocr_batch(inputs[i:i + args.ocr_batch])
+        per_image = (time.perf_counter() - start) * 1000 / len(inputs)
+        results[f"ocr (batches of {args.ocr_batch})"] = {"n": len(inputs), "mean_ms": round(per_image, 3)}
+
+    print(f"{'stage':<32} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, summary in results.items():
+        print(f"{name:<32} {summary['mean_ms']:>9.2f} {summary.get('p50_ms', float('nan')):>9.2f} "
+              f"{summary.get('p95_ms', float('nan')):>9.2f}")
+    save_results("ingest", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import quote
+import httpx
+from report import save_results, summarize
+
+# Request mix replayed against the server, roughly what the gallery sends while a user
+# moves the sliders and types in the search box
+SCENARIOS = {
+    "images": [
+        "/images?apply_date=true&min_date={lo}&max_date={hi}",
+        "/images?apply_date=true&min_date={lo}&max_date={hi}&type=political-campaigns",
+        "/images?apply_date=false&color=%23{color}&hue_tolerance=10",
+        "/images?apply_date=true&min_date={lo}&max_date={hi}&keyword={word}",
+        "/images?limit=100&min_date={lo}&max_date={hi}",
+    ],
+    "suggestions": ["/suggestions?q={word}"],
+    "image": ["/image/{filename}?w=128"],
+}
+WORDS = ["k", "ke", "ken", "for", "vote", "ni", "nix"]
+
+
+def make_path(template, filenames, rng):
+    lo = rng.randint(1936, 1990)
+    return template.format(
+        lo=lo, hi=rng.randint(lo, 2006), color=f"{rng.randint(0, 0xFFFFFF):06x}",
+        word=rng.choice(WORDS), filename=quote(rng.choice(filenames)) if filenames else "missing.jpg",
+    )
+
+
+async def worker(client, templates, filenames, deadline, rng, timings, errors):
+    while time.perf_counter() < deadline:
+        path = make_path(rng.choice(templates), filenames, rng)
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            await response.aread()
+            if response.status_code >= 400:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+        timings.append((time.perf_counter() - start) * 1000)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0) as client:
+        # Real filenames for the /image scenario
+        images = (await client.get("/images", params={"apply_date": "false", "fields": "image_url", "limit": 1000})).json()
+        filenames = [img["image_url"].rsplit("/image/", 1)[1] for img in images if img["image_url"]]
+
+        for scenario in args.scenarios:
+            timings, errors = [], {}
+            deadline = time.perf_counter() + args.duration
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                worker(client, SCENARIOS[scenario], filenames, deadline, random.Random(i), timings, errors)
+                for i in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+            summary = summarize(timings)
+            summary.update(requests_per_sec=round(len(timings) / elapsed, 1), errors=errors)
+            results[scenario] = summary
+            print(f"{scenario:<12} {summary['requests_per_sec']:>9.1f} req/s  p50 {summary['p50_ms']:.1f} ms  "
+                  f"p95 {summary['p95_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms  errors {errors or 0}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Concurrent HTTP load against a running backend (start it with: uvicorn app:app --workers N)."
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"🔎 {args.concurrency} concurrent clients against {args.url}, {args.duration:.0f}s per scenario\n")
+    save_results("load", args, asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
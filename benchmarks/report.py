@@ -0,0 +1,67 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Where every benchmark writes its JSON results (one file per run)
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def summarize(timings_ms):
+    """Latency summary of a list of timings in milliseconds."""
+    timings = sorted(timings_ms)
+    if not timings:
+        return {"n": 0}
+    if len(timings) > 1:
+        cuts = statistics.quantiles(timings, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = timings[0]
+    return {
+        "n": len(timings),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def time_calls(func, repeat):
+    """Call func() `repeat` times; returns the timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def save_results(name, args, results, folder=RESULTS_FOLDER):
+    """Write results plus enough context (commit, machine, arguments) to compare runs later."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "benchmark": name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✅ Results written to {path}")
+    return path
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "2_SQL"))
+from migrate_db import migrate, parse_diameter, parse_year
+
+BATCH_SIZE = 10000
+
+
+def synthetic_rows(templates, start, count, rng):
+    """
+    New rows modelled on real ones: same type, color and OCR text distribution, a numbered
+    title (so every filename is unique), and a random year / dimension some of the time.
+    """
+    for i in range(start, start + count):
+        t = rng.choice(templates)
+        title = f"{t['title'] or 'na'}-{i}"
+        date = t["date"] if rng.random() < 0.5 else (str(rng.randint(1936, 2006)) if rng.random() < 0.6 else None)
+        dimension = t["dimension"] if rng.random() < 0.5 else (f"{rng.randint(10, 90) / 10}cm" if rng.random() < 0.7 else None)
+        filename = f"{title}_{date or 'na'}_{t['type'] or 'na'}_{dimension or 'na'}.jpg".replace(" ", "-")
+        yield {
+            **t,
+            "title": title,
+            "date": date,
+            "dimension": dimension,
+            "filename": filename,
+            "content_hash": None,
+            "year": parse_year(date),
+            "diameter_cm": parse_diameter(dimension),
+            "source": t["filename"],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scale images2.db (and a matching fake archive/) up to N rows for benchmarking."
+    )
+    parser.add_argument("--rows", type=int, default=10000, help="Total rows in the generated catalog (e.g. 10000, 100000, 1000000)")
+    parser.add_argument("--template-db", default="images2.db", help="Real catalog whose rows are used as templates")
+    parser.add_argument("--template-archive", default="archive/", help="Real images the fake archive links to")
+    parser.add_argument("--out", required=True, help="Folder to create images2.db and archive/ in")
+    parser.add_argument("--no-archive", action="store_true", help="Skip the fake archive (image_url will be null)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    db_path = os.path.join(args.out, "images2.db")
+    if os.path.exists(db_path):
+        sys.exit(f"❌ {db_path} already exists")
+
+    # Start from a copy of the real catalog, upgraded to the current schema
+    template = sqlite3.connect(args.template_db)
+    conn = sqlite3.connect(db_path)
+    template.backup(conn)
+    template.close()
+    migrate(conn)
+
+    conn.row_factory = sqlite3.Row
+    templates = [dict(row) for row in conn.execute("SELECT * FROM images WHERE filename IS NOT NULL")]
+    conn.row_factory = None
+    columns = [c for c in templates[0] if c != "id"]
+    insert_sql = f"INSERT INTO images ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"
+
+    archive = None
+    if not args.no_archive:
+        archive = os.path.join(args.out, "archive")
+        os.makedirs(archive, exist_ok=True)
+        for t in templates:
+            link = os.path.join(archive, t["filename"])
+            if not os.path.lexists(link):
+                os.symlink(os.path.abspath(os.path.join(args.template_archive, t["filename"])), link)
+
+    rng = random.Random(args.seed)
+    missing = max(0, args.rows - len(templates))
+    print(f"🔎 Adding {missing} synthetic rows to {len(templates)} real ones")
+    start = time.perf_counter()
+    for offset in range(0, missing, BATCH_SIZE):
+        batch = list(synthetic_rows(templates, offset + 1, min(BATCH_SIZE, missing - offset), rng))
+        with conn:
+            conn.executemany(insert_sql, batch)
+        if archive:
+            for row in batch:
+                # Every synthetic image is a link to the real image it was modelled on
+                os.symlink(os.path.abspath(os.path.join(args.template_archive, row["source"])),
+                           os.path.join(archive, row["filename"]))
+        print(f"✅ {offset + len(batch)} / {missing} rows ({time.perf_counter() - start:.1f}s)")
+
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f"✅ Synthetic catalog with {len(templates) + missing} rows in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,11 @@ export default function ImageGallery() {
     return isNaN(num) ? imageSize : num * realLifeScale;
   };
 
+  // Ask the backend for a resized copy close to the displayed size
+  // (x2 covers retina screens and the hover zoom).
+  const getImageSrc = (imageUrl, displayPx) =>
+    `${encodeURI(imageUrl)}?w=${Math.ceil(displayPx * 2)}`;
+
   // Handler to fetch suggestions as the user types
   const handleSearchChange = async (e) => {
     const value = e.target.value;
@@ -329,7 +334,7 @@ export default function ImageGallery() {
                   >
                     {img.image_url ? (
                       <img
-                        src={encodeURI(img.image_url)}
+                        src={getImageSrc(img.image_url, computedWidth)}
                         alt={img.title}
                         className="gallery-image"
                         title={img.title}
@@ -371,7 +376,7 @@ export default function ImageGallery() {
               >
                 {img.image_url ? (
                   <img
-                    src={encodeURI(img.image_url)}
+                    src={getImageSrc(img.image_url, imageSize)}
                     alt={img.title}
                     className="gallery-image"
                   />